@@ -1,12 +1,31 @@
+import hashlib
+import itertools
+import math
+import mmap
+import os
+import sys
+
 import numpy as np
 import pandas as pd
 from pgmpy.models import BayesianNetwork
-from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
+from pgmpy.factors.discrete import DiscreteFactor, TabularCPD
+
+# The elimination planner and structured CPDs are shared from Lab 6; resolved once, at import
+LAB6 = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '6'))
+if LAB6 not in sys.path:
+    sys.path.append(LAB6)
+from planner import QueryPlanner  # noqa: E402
+from structured_cpd import RuleCPD  # noqa: E402
+
+TABLE_MAGIC = b'CBNPOST1'
+# magic + sha1 of the network (20 bytes) + 4 bytes padding + rows, columns (int64 each)
+TABLE_HEADER_SIZE = 8 + 20 + 4 + 2 * 8
 
 
 class StudentPerformanceCBN:
-    def __init__(self):
+    EVIDENCE = ['SH', 'A', 'MH', 'PAP', 'ES']
+
+    def __init__(self, materialize=False, table_path=None):
         # Define the network structure
         self.model = BayesianNetwork([
             ('PAP', 'SH'),
@@ -18,6 +37,8 @@ class StudentPerformanceCBN:
             ('PAP', 'Performance')
         ])
 
+        self.performance_rules = self._create_performance_rules()
+
         # Create CPDs with correct shape
         cpds = [
             self._create_cpd('PAP', 3, [[0.3], [0.4], [0.3]]),
@@ -35,6 +56,14 @@ class StudentPerformanceCBN:
         # Check model consistency
         assert self.model.check_model()
 
+        # Elimination orders are planned once per (query, evidence variables) shape
+        self.planner = QueryPlanner(self.model, cpds=[self.performance_rules])
+
+        # Opt-in dense posterior table; queries become a row lookup
+        self.posterior_table = None
+        if materialize:
+            self.materialize(table_path)
+
     def _create_cpd(self, variable, card, values):
         return TabularCPD(variable=variable, variable_card=card, values=values)
 
@@ -65,43 +94,127 @@ class StudentPerformanceCBN:
                           ]),
                           evidence=['MH'], evidence_card=[3])
 
+    def _create_performance_rules(self):
+        # Two corner cases differ from the default row; nothing else needs storing
+        return RuleCPD('Performance', 3, ['SH', 'A', 'MH', 'PAP'], [3, 3, 3, 3],
+                       default=[0.3, 0.5, 0.2],
+                       rules=[
+                           ({'SH': 2, 'A': 2, 'MH': 2, 'PAP': 2}, [0.0, 0.1, 0.9]),  # Best case
+                           ({'SH': 0, 'A': 0, 'MH': 0, 'PAP': 0}, [0.9, 0.1, 0.0])  # Worst case
+                       ])
+
     def _create_performance_cpd(self):
-        # Generate a comprehensive CPD for Performance
-        performance_values = np.zeros((3, 3 ** 4))
-
-        # Iterate through all combinations of SH, A, MH, PAP
-        for sh in range(3):
-            for a in range(3):
-                for mh in range(3):
-                    for pap in range(3):
-                        # Calculate index for this combination
-                        idx = sh * 3 ** 3 + a * 3 ** 2 + mh * 3 + pap
-
-                        # Simple logic for performance probability
-                        if sh == 2 and a == 2 and mh == 2 and pap == 2:
-                            # Best case
-                            performance_values[2, idx] = 0.9
-                            performance_values[1, idx] = 0.1
-                            performance_values[0, idx] = 0.0
-                        elif sh == 0 and a == 0 and mh == 0 and pap == 0:
-                            # Worst case
-                            performance_values[0, idx] = 0.9
-                            performance_values[1, idx] = 0.1
-                            performance_values[2, idx] = 0.0
-                        else:
-                            # Middle scenarios
-                            performance_values[1, idx] = 0.5
-                            performance_values[0, idx] = 0.3
-                            performance_values[2, idx] = 0.2
-
-        return TabularCPD(variable='Performance', variable_card=3,
-                          values=performance_values,
-                          evidence=['SH', 'A', 'MH', 'PAP'],
-                          evidence_card=[3, 3, 3, 3])
+        # pgmpy needs the full 3x81 table for check_model; inference uses the rules
+        return self.performance_rules.to_tabular()
+
+    def _table_shape(self):
+        """Mixed-radix digits: card + 1 per evidence variable, the last value meaning unobserved"""
+        return tuple(self.planner.card[name] + 1 for name in self.EVIDENCE)
+
+    def _fingerprint(self):
+        digest = hashlib.sha1(repr([(name, self.planner.card[name]) for name in self.planner.axis]).encode('utf-8'))
+        for variable in self.planner.variables:
+            for table, _ in self.planner.factors[variable]:
+                digest.update(np.ascontiguousarray(table, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def materialize(self, path=None, max_entries=10 ** 7):
+        """
+        Precompute P(Performance | evidence) for every partial assignment of EVIDENCE
+
+        Row r of the table answers the evidence whose mixed-radix code is r (see
+        evidence_code). Every subset of observed variables is filled with one batched
+        query. With path, the table is written there and later runs memory-map it as
+        long as the network is unchanged.
+
+        Raises:
+            ValueError: if the table would have more than max_entries entries
+        """
+        shape = self._table_shape()
+        entries = math.prod(shape) * self.planner.card['Performance']
+        if entries > max_entries:
+            raise ValueError(f"Posterior table needs {entries:,} entries, above max_entries={max_entries:,}")
+
+        fingerprint = self._fingerprint()
+        if path and os.path.exists(path):
+            table = self._load_table(path, fingerprint)
+            if table is not None:
+                self.posterior_table = table
+                return table
+
+        table = np.empty(shape + (self.planner.card['Performance'],))
+        for observed in itertools.product([False, True], repeat=len(self.EVIDENCE)):
+            names = [name for name, seen in zip(self.EVIDENCE, observed) if seen]
+            grid = np.array(list(itertools.product(*[range(self.planner.card[name]) for name in names]))).T
+            evidence = {name: np.array(self.planner.state_names[name])[codes] for name, codes in zip(names, grid)}
+            digits = tuple(grid[names.index(name)] if seen else digit - 1
+                           for name, seen, digit in zip(self.EVIDENCE, observed, shape))
+            table[digits] = self.planner.query_batch(['Performance'], evidence)
+
+        self.posterior_table = table.reshape(math.prod(shape), -1)
+        if path:
+            self._save_table(path, fingerprint)
+        return self.posterior_table
+
+    def _save_table(self, path, fingerprint):
+        header = np.array(self.posterior_table.shape, dtype='<i8')
+        with open(path, 'wb') as f:
+            f.write(TABLE_MAGIC + fingerprint + bytes(4))
+            f.write(header.tobytes())
+            f.write(self.posterior_table.astype('<f8').tobytes())
+
+    def _load_table(self, path, fingerprint):
+        """Memory-mapped table at path, or None if it was built from a different network"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:8] != TABLE_MAGIC or buffer[8:28] != fingerprint:
+            return None
+        rows, columns = np.frombuffer(buffer, dtype='<i8', count=2, offset=32)
+        return np.frombuffer(buffer, dtype='<f8', count=rows * columns, offset=TABLE_HEADER_SIZE).reshape(rows, columns)
+
+    def evidence_code(self, evidence):
+        """
+        Row index of the materialized table for evidence
+
+        Args:
+            evidence (dict or pd.DataFrame): {variable: state} or equal-length columns of
+                states; variables left out count as unobserved
+
+        Returns:
+            int or np.ndarray: One code, or one code per row
+        """
+        shape = self._table_shape()
+        unknown = set(evidence) - set(self.EVIDENCE)
+        if unknown:
+            raise ValueError(f"No evidence digit for {sorted(unknown)}")
+        if isinstance(evidence, dict) and all(np.isscalar(value) for value in evidence.values()):
+            digits = [self.planner.encode(name, evidence[name]) if name in evidence else digit - 1
+                      for name, digit in zip(self.EVIDENCE, shape)]
+        else:
+            digits = [self.planner.encode_column(name, evidence[name]) if name in evidence else digit - 1
+                      for name, digit in zip(self.EVIDENCE, shape)]
+        return np.ravel_multi_index(np.broadcast_arrays(*digits), shape)
 
     def predict_performance(self, evidence):
-        inference = VariableElimination(self.model)
-        return inference.query(variables=['Performance'], evidence=evidence)
+        if self.posterior_table is not None:
+            return DiscreteFactor(['Performance'], [self.planner.card['Performance']],
+                                  self.posterior_table[self.evidence_code(evidence)],
+                                  state_names={'Performance': self.planner.state_names['Performance']})
+        return self.planner.query(['Performance'], evidence)
+
+    def predict_performance_batch(self, evidence):
+        """
+        Performance posteriors for a whole cohort in one call
+
+        Args:
+            evidence (dict or pd.DataFrame): One column of states per observed variable
+
+        Returns:
+            np.ndarray: (students, 3) posterior over Performance
+        """
+        if self.posterior_table is not None:
+            return self.posterior_table[self.evidence_code(evidence)]
+        return self.planner.query_batch(['Performance'], evidence)
 
     def categorize_risk(self, performance_prob):
         performance_level = np.argmax(performance_prob.values)
@@ -139,6 +252,19 @@ def main():
         risk_category = cbn.categorize_risk(performance_query)
         print(f"Risk Category: {risk_category}")
 
+    # Score a synthetic cohort with one batched query instead of one query per student
+    rng = np.random.default_rng(0)
+    cohort = pd.DataFrame(rng.integers(0, 3, size=(10000, 5)), columns=['SH', 'A', 'MH', 'PAP', 'ES'])
+    posteriors = cbn.predict_performance_batch(cohort)
+    levels = np.bincount(posteriors.argmax(axis=1), minlength=3)
+    print(f"\nCohort of {len(cohort)} students: {levels[0]} high risk, {levels[1]} moderate, {levels[2]} low risk")
+
+    # Every partial evidence assignment precomputed; the same cohort becomes a table lookup
+    lookup = StudentPerformanceCBN(materialize=True)
+    assert np.allclose(lookup.predict_performance_batch(cohort), posteriors)
+    print(f"Materialized posterior table: {lookup.posterior_table.shape[0]} evidence codes, "
+          f"{lookup.posterior_table.nbytes / 1024:.0f} KiB")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,9 +4,15 @@ from sklearn.mixture import GaussianMixture
 from sklearn.preprocessing import StandardScaler
 from pgmpy.models import BayesianNetwork
 from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
 import matplotlib.pyplot as plt
 import os
+import sys
+
+# The elimination planner is shared from Lab 6; resolved once, at import
+LAB6 = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '6'))
+if LAB6 not in sys.path:
+    sys.path.append(LAB6)
+from planner import QueryPlanner  # noqa: E402
 
 
 class CustomerSegmentation:
@@ -15,6 +21,7 @@ class CustomerSegmentation:
         self.gmm = GaussianMixture(n_components=n_clusters, random_state=42)
         self.scaler = StandardScaler()
         self.bayesian_network = None
+        self.planner = None
 
         # Embedded data
         self.data = {
@@ -75,15 +82,15 @@ class CustomerSegmentation:
         )
 
         self.bayesian_network.add_cpds(z1_cpd, z2_cpd, cluster_cpd)
+        self.planner = QueryPlanner(self.bayesian_network)
 
     def compute_cluster_probability(self, z1_val, z2_val):
         """Compute P(Cluster2|Z1,Z2)"""
         z1_cat = 1 if z1_val >= 35 else 0
         z2_cat = 1 if z2_val >= 4000 else 0
 
-        inference = VariableElimination(self.bayesian_network)
         evidence = {'Z1': z1_cat, 'Z2': z2_cat}
-        result = inference.query(variables=['Cluster'], evidence=evidence)
+        result = self.planner.query(['Cluster'], evidence)
         return result.values[1]
 
     def visualize_clusters(self):
@@ -1,4 +1,133 @@
-from collections import defaultdict, Counter
+import hashlib
+import mmap
+import os
+from collections import defaultdict, Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.special import expit
+
+
+MODEL_MAGIC = b'NBSPAM02'
+SKETCH_MAGIC = b'NBSKCH01'
+# magic + six int64 fields: n_words, reserved, blob_size, spam_emails, ham_emails, reserved
+# for the exact model; depth, n_buckets, reserved, spam_emails, ham_emails, reserved for a sketch
+HEADER_SIZE = 8 + 6 * 8
+# A blake2b digest (at most 64 bytes) supplies 4 bytes to each sketch row
+MAX_SKETCH_DEPTH = 16
+
+
+def _write_header(f, magic, fields):
+    f.write(magic)
+    f.write(np.array(fields, dtype='<i8').tobytes())
+
+
+def _map_model(path, magic, kind):
+    """Memory-map a saved model and return (buffer, the six header fields)"""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:8] != magic:
+        raise ValueError(f"{path} is not a saved {kind} model")
+    return buffer, np.frombuffer(buffer, dtype='<i8', count=6, offset=8).tolist()
+
+
+def word_keys(words):
+    """
+    64-bit keys of many words at once, stable across processes unlike hash()
+
+    FNV-1a over each word's code points plus a final bit mix, run column by column
+    over a padded code-point array. Words are grouped by bit length so padding at
+    most doubles the array.
+    """
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    keys = np.full(len(words), 0xcbf29ce484222325, dtype=np.uint64)
+    groups = np.frexp(lengths.astype(np.float64))[1]
+    for group in np.unique(groups):
+        members = np.flatnonzero(groups == group)
+        codes = np.array([words[idx] for idx in members], dtype=str).view('<u4').reshape(len(members), -1)
+        group_lengths = lengths[members]
+        group_keys = keys[members]
+        for column in range(int(group_lengths.max(initial=0))):
+            active = column < group_lengths
+            group_keys = np.where(active, (group_keys ^ codes[:, column]) * np.uint64(0x100000001b3), group_keys)
+        keys[members] = group_keys
+
+    keys ^= keys >> np.uint64(33)
+    keys *= np.uint64(0xff51afd7ed558ccd)
+    keys ^= keys >> np.uint64(33)
+    return keys
+
+
+class MappedVocabulary:
+    """Read-only word -> id lookup over the sorted string table of a saved model"""
+
+    def __init__(self, offsets, blob, keys, key_ids):
+        self.offsets = offsets
+        self.blob = blob
+        self.keys = keys
+        self.key_ids = key_ids
+
+    def ids(self, words):
+        """
+        Ids of many words at once, -1 for unknown ones
+
+        All words are hashed in one vectorized pass and found with one searchsorted over
+        the sorted key array, queried in sorted order for locality. save() guarantees
+        vocabulary keys are unique, so an unknown word is only mistaken for a known one
+        if its 64-bit key collides with one of the n vocabulary keys, with probability
+        about n / 2**64.
+        """
+        if not len(self.keys):
+            return np.full(len(words), -1, dtype=np.int64)
+        keys = word_keys(words)
+        order = np.argsort(keys)
+        positions = np.empty(len(keys), dtype=np.intp)
+        positions[order] = np.searchsorted(self.keys, keys[order])
+        positions = np.minimum(positions, len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.key_ids[positions], -1)
+
+    def get(self, word, default=None):
+        idx = int(self.ids([word])[0])
+        # Single lookups also confirm the stored bytes, so get() is exact
+        if idx < 0 or self.blob[self.offsets[idx]:self.offsets[idx + 1]] != word.encode('utf-8'):
+            return default
+        return idx
+
+    def __getitem__(self, word):
+        idx = self.get(word)
+        if idx is None:
+            raise KeyError(word)
+        return idx
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]]).decode('utf-8')
+
+
+class MappedCounts:
+    """Read-only word -> count view that behaves like the training defaultdicts"""
+
+    def __init__(self, vocabulary, counts):
+        self.vocabulary = vocabulary
+        self.counts = counts
+
+    def get(self, word, default=0):
+        idx = self.vocabulary.get(word)
+        return default if idx is None else int(self.counts[idx])
+
+    def __getitem__(self, word):
+        return self.get(word)
+
+    def items(self):
+        return zip(self.vocabulary, (int(count) for count in self.counts))
 
 
 class NaiveBayesSpamFilter:
@@ -9,6 +138,11 @@ class NaiveBayesSpamFilter:
         self.ham_emails = 0
         self.vocabulary = set()
 
+        # Log-space scoring tables, rebuilt lazily after training
+        self.word_index = None
+        self.log_likelihood_ratio = None
+        self.log_prior_ratio = None
+
     def train(self, emails, labels):
         for email, label in zip(emails, labels):
             words = email.lower().split()
@@ -24,6 +158,53 @@ class NaiveBayesSpamFilter:
 
             self.vocabulary.update(words)
 
+        self.word_index = None
+
+    def merge(self, other):
+        """Add the counts of another (partial) filter into this one; exact, order-independent"""
+        for word, count in other.spam_word_counts.items():
+            self.spam_word_counts[word] += count
+        for word, count in other.ham_word_counts.items():
+            self.ham_word_counts[word] += count
+        self.spam_emails += other.spam_emails
+        self.ham_emails += other.ham_emails
+        self.vocabulary.update(other.vocabulary)
+
+        self.word_index = None
+        return self
+
+    def train_stream(self, examples, chunk_size=10000, processes=None):
+        """
+        Train from an iterable of (email, label) pairs without holding the corpus in memory
+
+        Args:
+            examples (iterable): (email, label) pairs, e.g. from read_labelled_emails
+            chunk_size (int): Number of emails counted by a worker at a time
+            processes (int): Worker processes; None uses every core
+
+        Returns:
+            NaiveBayesSpamFilter: self, for chaining
+        """
+        examples = iter(examples)
+        processes = processes or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            # Keep at most two chunks per worker in flight so memory stays bounded
+            max_pending = 2 * processes
+            pending = deque()
+            while True:
+                chunk = list(islice(examples, chunk_size))
+                if chunk:
+                    pending.append(pool.submit(_count_chunk, chunk, self.empty_copy()))
+                if pending and (len(pending) >= max_pending or not chunk):
+                    self.merge(pending.popleft().result())
+                elif not chunk:
+                    break
+        return self
+
+    def empty_copy(self):
+        """Untrained filter with the same configuration, used for partial counts"""
+        return NaiveBayesSpamFilter()
+
     def calculate_word_probability(self, word, is_spam):
         """Calculate P(word|spam) or P(word|ham) with Laplace smoothing"""
         if is_spam:
@@ -62,6 +243,294 @@ class NaiveBayesSpamFilter:
 
         return ('spam' if spam_probability > 0.5 else 'not spam', spam_probability)
 
+    def build_log_tables(self):
+        """Precompute log P(word|spam) - log P(word|ham) for every vocabulary id"""
+        words = sorted(self.vocabulary)
+        self.word_index = {word: idx for idx, word in enumerate(words)}
+
+        spam_counts = np.array([self.spam_word_counts.get(word, 0) for word in words], dtype=np.float64)
+        ham_counts = np.array([self.ham_word_counts.get(word, 0) for word in words], dtype=np.float64)
+
+        # Same Laplace smoothing as calculate_word_probability, kept in log space
+        with np.errstate(divide='ignore'):
+            self.log_likelihood_ratio = (np.log(spam_counts + 1) - np.log(self.spam_emails + 2)) - \
+                                        (np.log(ham_counts + 1) - np.log(self.ham_emails + 2))
+            self.log_prior_ratio = np.log(self.spam_emails) - np.log(self.ham_emails)
+
+    def document_term_matrix(self, emails):
+        """Build a sparse (emails x vocabulary) word count matrix, dropping unknown words"""
+        if self.word_index is None:
+            self.build_log_tables()
+
+        if isinstance(self.word_index, MappedVocabulary):
+            # A loaded model resolves the whole batch with one vectorized lookup
+            tokens = [email.lower().split() for email in emails]
+            ids = self.word_index.ids([word for words in tokens for word in words])
+            lengths = np.array([len(words) for words in tokens], dtype=np.int64)
+            known = ids >= 0
+            indices = ids[known].astype(np.int32)
+            indptr = np.zeros(len(emails) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum(np.bincount(np.repeat(np.arange(len(emails)), lengths)[known],
+                                               minlength=len(emails)))
+        else:
+            lookup = self.word_index.get
+            indices = []
+            indptr = [0]
+            for email in emails:
+                ids = [lookup(word, -1) for word in email.lower().split()]
+                indices.extend(idx for idx in ids if idx >= 0)
+                indptr.append(len(indices))
+            indices = np.array(indices, dtype=np.int32)
+            indptr = np.array(indptr, dtype=np.int64)
+
+        data = np.ones(len(indices), dtype=np.float64)
+        return csr_matrix((data, indices, indptr), shape=(len(emails), len(self.word_index)))
+
+    def classify_batch(self, emails):
+        """
+        Classify a whole mailbox in log space with one sparse matrix-vector product
+
+        Args:
+            emails (list[str]): The email texts to classify
+
+        Returns:
+            tuple: (classifications, spam_probabilities) as NumPy arrays
+        """
+        counts = self.document_term_matrix(emails)
+
+        # log P(spam|words) - log P(ham|words), then squash back to a probability
+        log_odds = self.log_prior_ratio + counts @ self.log_likelihood_ratio
+        spam_probabilities = expit(log_odds)
+
+        classifications = np.where(spam_probabilities > 0.5, 'spam', 'not spam')
+        return classifications, spam_probabilities
+
+    def save(self, path):
+        """
+        Write the model as a sorted string table plus contiguous count and log-ratio arrays
+
+        Layout (all sections 8-byte aligned, little endian):
+            header | word offsets int64[n+1] | sorted word keys uint64[n] | their word ids int64[n] |
+            spam counts int64[n] | ham counts int64[n] | log-likelihood ratios float64[n] | utf-8 words
+        """
+        self.build_log_tables()
+        words = [word.encode('utf-8') for word in self.word_index]
+        n_words = len(words)
+
+        offsets = np.zeros(n_words + 1, dtype='<i8')
+        offsets[1:] = np.cumsum([len(word) for word in words])
+
+        # Word ids sorted by 64-bit key, so lookups are a searchsorted away
+        keys = word_keys(list(self.word_index))
+        key_ids = np.argsort(keys, kind='stable').astype('<i8')
+        keys = keys[key_ids]
+        if n_words > 1 and (keys[1:] == keys[:-1]).any():
+            raise ValueError("Two vocabulary words share a 64-bit key; cannot save this vocabulary")
+        spam_counts = np.array([self.spam_word_counts.get(word, 0) for word in self.word_index], dtype='<i8')
+        ham_counts = np.array([self.ham_word_counts.get(word, 0) for word in self.word_index], dtype='<i8')
+        blob = b''.join(words)
+
+        with open(path, 'wb') as f:
+            _write_header(f, MODEL_MAGIC, [n_words, 0, len(blob), self.spam_emails, self.ham_emails, 0])
+            f.write(offsets.tobytes())
+            f.write(keys.astype('<u8').tobytes())
+            f.write(key_ids.tobytes())
+            f.write(spam_counts.tobytes())
+            f.write(ham_counts.tobytes())
+            f.write(self.log_likelihood_ratio.astype('<f8').tobytes())
+            f.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a model written by save(); arrays are zero-copy views shared across forks
+
+        The loaded filter classifies normally but is read-only: train() and merge() need a fresh filter.
+        """
+        buffer, header = _map_model(path, MODEL_MAGIC, 'NaiveBayesSpamFilter')
+        n_words, _, blob_size, spam_emails, ham_emails, _ = header
+
+        position = HEADER_SIZE
+        offsets = np.frombuffer(buffer, dtype='<i8', count=n_words + 1, offset=position)
+        position += offsets.nbytes
+        keys = np.frombuffer(buffer, dtype='<u8', count=n_words, offset=position)
+        position += keys.nbytes
+        key_ids = np.frombuffer(buffer, dtype='<i8', count=n_words, offset=position)
+        position += key_ids.nbytes
+        spam_counts = np.frombuffer(buffer, dtype='<i8', count=n_words, offset=position)
+        position += spam_counts.nbytes
+        ham_counts = np.frombuffer(buffer, dtype='<i8', count=n_words, offset=position)
+        position += ham_counts.nbytes
+        log_likelihood_ratio = np.frombuffer(buffer, dtype='<f8', count=n_words, offset=position)
+        position += log_likelihood_ratio.nbytes
+        blob = memoryview(buffer)[position:position + blob_size]
+
+        spam_filter = cls()
+        vocabulary = MappedVocabulary(offsets, blob, keys, key_ids)
+        spam_filter.vocabulary = vocabulary
+        spam_filter.word_index = vocabulary
+        spam_filter.spam_word_counts = MappedCounts(vocabulary, spam_counts)
+        spam_filter.ham_word_counts = MappedCounts(vocabulary, ham_counts)
+        spam_filter.spam_emails = spam_emails
+        spam_filter.ham_emails = ham_emails
+        spam_filter.log_likelihood_ratio = log_likelihood_ratio
+        with np.errstate(divide='ignore'):
+            spam_filter.log_prior_ratio = np.log(spam_emails) - np.log(ham_emails)
+        return spam_filter
+
+
+class SketchVocabulary:
+    """Membership test for a hashed filter: a word is known if its estimated count is non-zero"""
+
+    def __init__(self, spam_filter):
+        self.spam_filter = spam_filter
+
+    def __contains__(self, word):
+        spam_count, ham_count = self.spam_filter.estimate_counts(word)
+        return spam_count + ham_count > 0
+
+
+class HashedNaiveBayesSpamFilter(NaiveBayesSpamFilter):
+    """
+    Naive Bayes spam filter with a fixed-size count-min sketch instead of per-word dicts
+
+    Memory is 2 * depth * n_buckets counters no matter how many distinct tokens are seen.
+    With depth=1 this is plain feature hashing; more rows trade memory for fewer
+    over-estimated counts. Colliding words share counts, so accuracy drops as the
+    number of distinct words approaches n_buckets.
+    """
+
+    def __init__(self, n_buckets=2 ** 18, depth=2):
+        if not 1 <= depth <= MAX_SKETCH_DEPTH:
+            raise ValueError(f"depth must be between 1 and {MAX_SKETCH_DEPTH}")
+        super().__init__()
+        self.n_buckets = n_buckets
+        self.depth = depth
+        self.spam_word_counts = np.zeros((depth, n_buckets), dtype=np.int64)
+        self.ham_word_counts = np.zeros((depth, n_buckets), dtype=np.int64)
+        self.vocabulary = SketchVocabulary(self)
+
+    def empty_copy(self):
+        return HashedNaiveBayesSpamFilter(self.n_buckets, self.depth)
+
+    def buckets(self, words):
+        """Bucket ids of every word in every sketch row, shape (depth, len(words))"""
+        # One blake2b digest per word, cut into depth 32-bit words: each row reads its own
+        # digest bytes, so words colliding in one row are no more likely to collide in another.
+        # (Seeding crc32 per row does not work: it is affine in the seed, so equal-length
+        # words that collide modulo a power of two collide in every row.)
+        digest_size = 4 * self.depth
+        digests = b''.join(hashlib.blake2b(word.encode('utf-8'), digest_size=digest_size).digest()
+                           for word in words)
+        hashes = np.frombuffer(digests, dtype='<u4').reshape(len(words), self.depth).T
+        return (hashes % self.n_buckets).astype(np.int64)
+
+    def estimate_counts(self, word):
+        """Count-min estimates (spam count, ham count) of a single word"""
+        buckets = self.buckets([word])[:, 0]
+        rows = np.arange(self.depth)
+        return (int(self.spam_word_counts[rows, buckets].min()),
+                int(self.ham_word_counts[rows, buckets].min()))
+
+    def train(self, emails, labels):
+        rows = np.arange(self.depth)[:, None]
+        for email, label in zip(emails, labels):
+            words = email.lower().split()
+            if label == 'spam':
+                self.spam_emails += 1
+                counts = self.spam_word_counts
+            else:
+                self.ham_emails += 1
+                counts = self.ham_word_counts
+            np.add.at(counts, (rows, self.buckets(words)), 1)
+
+    def merge(self, other):
+        if (other.n_buckets, other.depth) != (self.n_buckets, self.depth):
+            raise ValueError("Can only merge hashed filters with the same n_buckets and depth")
+        self.spam_word_counts += other.spam_word_counts
+        self.ham_word_counts += other.ham_word_counts
+        self.spam_emails += other.spam_emails
+        self.ham_emails += other.ham_emails
+        return self
+
+    def calculate_word_probability(self, word, is_spam):
+        spam_count, ham_count = self.estimate_counts(word)
+        if is_spam:
+            return (spam_count + 1) / (self.spam_emails + 2)
+        return (ham_count + 1) / (self.ham_emails + 2)
+
+    def classify_batch(self, emails):
+        tokens = [email.lower().split() for email in emails]
+        lengths = np.array([len(words) for words in tokens], dtype=np.int64)
+        buckets = self.buckets([word for words in tokens for word in words])
+
+        rows = np.arange(self.depth)[:, None]
+        spam_counts = self.spam_word_counts[rows, buckets].min(axis=0).astype(np.float64)
+        ham_counts = self.ham_word_counts[rows, buckets].min(axis=0).astype(np.float64)
+
+        # Words with no estimated count are skipped, as in classify()
+        with np.errstate(divide='ignore'):
+            known = (spam_counts + ham_counts) > 0
+            log_likelihood_ratio = (np.log(spam_counts + 1) - np.log(self.spam_emails + 2)) - \
+                                   (np.log(ham_counts + 1) - np.log(self.ham_emails + 2))
+            log_prior_ratio = np.log(self.spam_emails) - np.log(self.ham_emails)
+
+        email_ids = np.repeat(np.arange(len(emails)), lengths)
+        log_odds = log_prior_ratio + np.bincount(email_ids, weights=log_likelihood_ratio * known,
+                                                 minlength=len(emails))
+        spam_probabilities = expit(log_odds)
+
+        classifications = np.where(spam_probabilities > 0.5, 'spam', 'not spam')
+        return classifications, spam_probabilities
+
+    def memory_bytes(self):
+        """Bytes held by the count sketches; fixed at construction"""
+        return self.spam_word_counts.nbytes + self.ham_word_counts.nbytes
+
+    def save(self, path):
+        """
+        Write the sketch in the same header-plus-arrays layout as NaiveBayesSpamFilter.save
+
+        Layout (little endian): header | spam counts int64[depth, n_buckets] | ham counts int64[depth, n_buckets]
+        """
+        with open(path, 'wb') as f:
+            _write_header(f, SKETCH_MAGIC, [self.depth, self.n_buckets, 0, self.spam_emails, self.ham_emails, 0])
+            f.write(self.spam_word_counts.astype('<i8').tobytes())
+            f.write(self.ham_word_counts.astype('<i8').tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a sketch written by save(); read-only, like a loaded NaiveBayesSpamFilter"""
+        buffer, header = _map_model(path, SKETCH_MAGIC, 'HashedNaiveBayesSpamFilter')
+        depth, n_buckets, _, spam_emails, ham_emails, _ = header
+
+        # The zero-filled sketches allocated here are never touched before being replaced
+        spam_filter = cls(n_buckets, depth)
+        size = depth * n_buckets
+        spam_filter.spam_word_counts = np.frombuffer(buffer, dtype='<i8', count=size,
+                                                     offset=HEADER_SIZE).reshape(depth, n_buckets)
+        spam_filter.ham_word_counts = np.frombuffer(buffer, dtype='<i8', count=size,
+                                                    offset=HEADER_SIZE + 8 * size).reshape(depth, n_buckets)
+        spam_filter.spam_emails = spam_emails
+        spam_filter.ham_emails = ham_emails
+        return spam_filter
+
+
+def _count_chunk(chunk, partial):
+    """Worker: count one chunk of (email, label) pairs into an empty partial filter"""
+    emails, labels = zip(*chunk)
+    partial.train(emails, labels)
+    return partial
+
+
+def read_labelled_emails(path):
+    """Stream (email, label) pairs from a file with one 'label<TAB>email text' per line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            label, _, email = line.rstrip('\n').partition('\t')
+            if email:
+                yield email, label
+
 
 # Example usage
 def main():
@@ -85,6 +554,12 @@ def main():
     print(f"Classification: {classification}")
     print(f"Spam probability: {probability:.2%}")
 
+    # Score several emails at once in log space
+    new_emails = [new_email, "project meeting tomorrow", "free offer"]
+    classifications, probabilities = spam_filter.classify_batch(new_emails)
+    for email, classification, probability in zip(new_emails, classifications, probabilities):
+        print(f"Batch: '{email}' -> {classification} ({probability:.2%})")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
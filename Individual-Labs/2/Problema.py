@@ -1,3 +1,7 @@
+import numpy as np
+from scipy.special import expit
+
+
 def rare_disease_test():
     p_disease = 1 / 10000
     p_positive_given_disease = 0.99
@@ -10,3 +14,122 @@ def rare_disease_test():
     # P(Disease|Positive)
     p_disease_given_positive = (p_positive_given_disease * p_disease) / p_positive
     return round(p_disease_given_positive * 100, 2)  # Return percentage
+
+
+def screening_posteriors(prevalence, sensitivity, false_positive_rate):
+    """
+    Vectorized Bayes update for a diagnostic test; inputs broadcast like NumPy arrays
+
+    Args:
+        prevalence: P(Disease)
+        sensitivity: P(Positive|Disease)
+        false_positive_rate: P(Positive|No Disease)
+
+    Returns:
+        dict: 'p_positive', 'ppv' = P(Disease|Positive) and 'npv' = P(No Disease|Negative)
+    """
+    prevalence = np.asarray(prevalence, dtype=np.float64)
+    sensitivity = np.asarray(sensitivity, dtype=np.float64)
+    false_positive_rate = np.asarray(false_positive_rate, dtype=np.float64)
+
+    true_positive = sensitivity * prevalence
+    false_positive = false_positive_rate * (1 - prevalence)
+    true_negative = (1 - false_positive_rate) * (1 - prevalence)
+    false_negative = (1 - sensitivity) * prevalence
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'p_positive': true_positive + false_positive,
+            'ppv': true_positive / (true_positive + false_positive),
+            'npv': true_negative / (true_negative + false_negative),
+        }
+
+
+def sequential_posteriors(prevalence, sensitivity, false_positive_rate, results):
+    """
+    P(Disease|results so far) after each test in a chain of conditionally independent tests
+
+    Works in log-odds space, so long chains do not underflow.
+
+    Args:
+        prevalence, sensitivity, false_positive_rate: broadcastable arrays as in screening_posteriors
+        results (sequence of bool): Outcome of each test, True for positive
+
+    Returns:
+        np.ndarray: Posteriors with the test index as the last axis
+    """
+    prevalence = np.asarray(prevalence, dtype=np.float64)
+    sensitivity = np.asarray(sensitivity, dtype=np.float64)
+    false_positive_rate = np.asarray(false_positive_rate, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_prior_odds = np.log(prevalence) - np.log1p(-prevalence)
+        log_lr_positive = np.log(sensitivity) - np.log(false_positive_rate)
+        log_lr_negative = np.log1p(-sensitivity) - np.log1p(-false_positive_rate)
+
+    # Each posterior only depends on how many positives and negatives came before it
+    results = np.asarray(results, dtype=bool)
+    n_positive = np.cumsum(results)
+    n_negative = np.cumsum(~results)
+
+    log_odds = log_prior_odds[..., None] + \
+        log_lr_positive[..., None] * n_positive + log_lr_negative[..., None] * n_negative
+    return expit(log_odds)
+
+
+def screening_grid(prevalences, sensitivities, false_positive_rates, results=(), chunk_size=1_000_000):
+    """
+    Sweep every (prevalence, sensitivity, false_positive_rate) combination in fixed-size chunks
+
+    Only one chunk of the flattened grid is materialized at a time, so the grid may be
+    far larger than memory.
+
+    Args:
+        prevalences, sensitivities, false_positive_rates: 1-D arrays spanning the grid axes
+        results (sequence of bool): Optional repeated-test chain evaluated for every point
+        chunk_size (int): Grid points per yielded chunk
+
+    Yields:
+        dict: 'start' (flat grid index of the first row), the three parameter columns,
+        'ppv', 'npv' and, if results were given, 'chain' with shape (rows, len(results))
+    """
+    axes = [np.asarray(axis, dtype=np.float64) for axis in (prevalences, sensitivities, false_positive_rates)]
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape))
+
+    for start in range(0, total, chunk_size):
+        flat_index = np.arange(start, min(start + chunk_size, total))
+        prevalence, sensitivity, false_positive_rate = (
+            axis[index] for axis, index in zip(axes, np.unravel_index(flat_index, shape)))
+
+        chunk = {
+            'start': start,
+            'prevalence': prevalence,
+            'sensitivity': sensitivity,
+            'false_positive_rate': false_positive_rate,
+        }
+        posteriors = screening_posteriors(prevalence, sensitivity, false_positive_rate)
+        chunk['ppv'] = posteriors['ppv']
+        chunk['npv'] = posteriors['npv']
+        if len(results):
+            chunk['chain'] = sequential_posteriors(prevalence, sensitivity, false_positive_rate, results)
+        yield chunk
+
+
+def main():
+    print(f"P(Disease|Positive) = {rare_disease_test()}%")
+
+    # Same question for a whole grid of screening programmes, plus a confirmatory second test
+    prevalences = np.logspace(-5, -1, 200)
+    sensitivities = np.linspace(0.8, 0.999, 100)
+    false_positive_rates = np.logspace(-4, -1, 100)
+
+    rescued = 0
+    for chunk in screening_grid(prevalences, sensitivities, false_positive_rates,
+                                results=[True, True], chunk_size=250_000):
+        rescued += np.count_nonzero((chunk['ppv'] < 0.5) & (chunk['chain'][:, -1] >= 0.5))
+    print(f"Scenarios where a second positive pushes P(Disease) past 50%: {rescued:,} of "
+          f"{len(prevalences) * len(sensitivities) * len(false_positive_rates):,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Implementare import HashedNaiveBayesSpamFilter, NaiveBayesSpamFilter, read_labelled_emails
+
+
+def generate_mailbox(n_emails, vocabulary_size=5000, words_per_email=150, seed=0):
+    """Generate a synthetic labelled mailbox with spam-leaning and ham-leaning words"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(vocabulary_size)])
+    half = vocabulary_size // 2
+
+    emails, labels = [], []
+    for _ in range(n_emails):
+        is_spam = rng.random() < 0.4
+        # Spam draws mostly from the first half of the vocabulary, ham from the second
+        biased = rng.integers(0, half, words_per_email) + (0 if is_spam else half)
+        uniform = rng.integers(0, vocabulary_size, words_per_email)
+        words = np.where(rng.random(words_per_email) < 0.7, biased, uniform)
+        emails.append(" ".join(vocabulary[words]))
+        labels.append('spam' if is_spam else 'not spam')
+    return emails, labels
+
+
+def messages_per_second(classify, emails):
+    start = time.perf_counter()
+    classify(emails)
+    return len(emails) / (time.perf_counter() - start)
+
+
+def benchmark_classification(n_train=5000, n_test=20000):
+    emails, labels = generate_mailbox(n_train + n_test)
+    spam_filter = NaiveBayesSpamFilter()
+    spam_filter.train(emails[:n_train], labels[:n_train])
+    spam_filter.build_log_tables()
+    mailbox = emails[n_train:]
+
+    def classify_loop(batch):
+        results = []
+        for email in batch:
+            try:
+                results.append(spam_filter.classify(email))
+            except ZeroDivisionError:
+                # The linear-space product underflowed to 0/0
+                results.append(('underflow', float('nan')))
+        return results
+
+    loop_rate = messages_per_second(classify_loop, mailbox)
+    batch_rate = messages_per_second(spam_filter.classify_batch, mailbox)
+
+    underflows = sum(result[0] == 'underflow' for result in classify_loop(mailbox[:1000]))
+    print(f"Per-email classify:  {loop_rate:,.0f} messages/sec "
+          f"({underflows / 10:.1f}% of emails underflow to 0/0)")
+    print(f"Log-space batch:     {batch_rate:,.0f} messages/sec "
+          f"({batch_rate / loop_rate:.1f}x)")
+
+
+def benchmark_training(n_emails=40000, chunk_size=5000):
+    emails, labels = generate_mailbox(n_emails)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'corpus.tsv')
+        with open(path, 'w', encoding='utf-8') as f:
+            for email, label in zip(emails, labels):
+                f.write(f"{label}\t{email}\n")
+        del emails, labels
+
+        start = time.perf_counter()
+        in_memory = NaiveBayesSpamFilter()
+        in_memory.train(*zip(*read_labelled_emails(path)))
+        in_memory_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        streamed = NaiveBayesSpamFilter().train_stream(read_labelled_emails(path), chunk_size=chunk_size)
+        streamed_time = time.perf_counter() - start
+
+    assert streamed.spam_word_counts == in_memory.spam_word_counts
+    assert streamed.ham_word_counts == in_memory.ham_word_counts
+    print(f"In-memory train:     {n_emails / in_memory_time:,.0f} emails/sec")
+    print(f"Streaming train:     {n_emails / streamed_time:,.0f} emails/sec "
+          f"on {os.cpu_count()} cores (identical counts)")
+
+
+def benchmark_cold_start(vocabulary_size=500000):
+    emails, labels = generate_mailbox(20000, vocabulary_size=vocabulary_size, words_per_email=60)
+    spam_filter = NaiveBayesSpamFilter()
+    spam_filter.train(emails, labels)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, 'model.pkl')
+        model_path = os.path.join(tmp, 'model.nbm')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(spam_filter, f)
+        spam_filter.save(model_path)
+
+        start = time.perf_counter()
+        with open(pickle_path, 'rb') as f:
+            unpickled = pickle.load(f)
+        unpickled.build_log_tables()
+        pickle_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mapped = NaiveBayesSpamFilter.load(model_path)
+        load_time = time.perf_counter() - start
+
+        expected = unpickled.classify_batch(emails[:1000])[1]
+        assert np.allclose(mapped.classify_batch(emails[:1000])[1], expected)
+        # Best of three, so page faults on first touch of the mapping count as load cost
+        in_memory_rate = max(messages_per_second(unpickled.classify_batch, emails[:5000]) for _ in range(3))
+        mapped_rate = max(messages_per_second(mapped.classify_batch, emails[:5000]) for _ in range(3))
+
+        # The hashed filter round-trips through the same mmap format
+        hashed = HashedNaiveBayesSpamFilter()
+        hashed.train(emails, labels)
+        sketch_path = os.path.join(tmp, 'model.nbs')
+        hashed.save(sketch_path)
+        start = time.perf_counter()
+        mapped_sketch = HashedNaiveBayesSpamFilter.load(sketch_path)
+        sketch_load_time = time.perf_counter() - start
+        assert np.array_equal(mapped_sketch.spam_word_counts, hashed.spam_word_counts)
+        assert np.array_equal(mapped_sketch.ham_word_counts, hashed.ham_word_counts)
+        assert np.array_equal(mapped_sketch.classify_batch(emails[:1000])[1], hashed.classify_batch(emails[:1000])[1])
+
+    print(f"Cold start, {len(spam_filter.vocabulary):,} words: "
+          f"unpickle {pickle_time * 1000:.1f} ms, mmap load {load_time * 1000:.2f} ms, "
+          f"sketch mmap load {sketch_load_time * 1000:.2f} ms")
+    print(f"Steady state:        {in_memory_rate:,.0f} messages/sec in memory, "
+          f"{mapped_rate:,.0f} messages/sec mmap-loaded")
+
+
+def exact_memory_bytes(spam_filter):
+    """Approximate bytes held by the exact filter's dicts, vocabulary set and word strings"""
+    total = sum(sys.getsizeof(table) for table in
+                (spam_filter.spam_word_counts, spam_filter.ham_word_counts, spam_filter.vocabulary))
+    return total + sum(sys.getsizeof(word) for word in spam_filter.vocabulary)
+
+
+def benchmark_hashing(n_train=20000, n_test=5000, junk_per_email=10):
+    emails, labels = generate_mailbox(n_train + n_test, vocabulary_size=20000, words_per_email=5)
+    # Unique junk tokens (URLs, random strings) make the exact vocabulary grow without bound
+    rng = np.random.default_rng(1)
+    emails = [email + " " + " ".join(f"http://x{token:x}" for token in rng.integers(0, 2 ** 48, junk_per_email))
+              for email in emails]
+    test_labels = np.array(labels[n_train:])
+
+    exact = NaiveBayesSpamFilter()
+    exact.train(emails[:n_train], labels[:n_train])
+    exact_predictions = exact.classify_batch(emails[n_train:])[0]
+    print(f"Exact dicts:         {exact_memory_bytes(exact) / 2 ** 10:8.0f} KiB, "
+          f"accuracy {np.mean(exact_predictions == test_labels):.2%}")
+
+    for n_buckets in (2 ** 12, 2 ** 14, 2 ** 16, 2 ** 18, 2 ** 20):
+        hashed = HashedNaiveBayesSpamFilter(n_buckets=n_buckets, depth=2)
+        hashed.train(emails[:n_train], labels[:n_train])
+        predictions = hashed.classify_batch(emails[n_train:])[0]
+        print(f"Hashed {n_buckets:>7} x2:   {hashed.memory_bytes() / 2 ** 10:8.0f} KiB, "
+              f"accuracy {np.mean(predictions == test_labels):.2%}, "
+              f"agrees with exact {np.mean(predictions == exact_predictions):.2%}")
+
+
+def benchmark_sketch_depth(n_train=20000, budget=2 ** 20, depths=(1, 2, 4, 8), junk_per_email=10):
+    """Mean count over-estimate of the sketch as depth grows at a fixed number of counters"""
+    emails, labels = generate_mailbox(n_train, vocabulary_size=20000, words_per_email=5)
+    rng = np.random.default_rng(1)
+    emails = [email + " " + " ".join(f"http://x{token:x}" for token in rng.integers(0, 2 ** 48, junk_per_email))
+              for email in emails]
+
+    exact = NaiveBayesSpamFilter()
+    exact.train(emails, labels)
+    words = sorted(exact.vocabulary)
+    true_counts = np.array([exact.spam_word_counts.get(word, 0) for word in words])
+
+    print(f"Sketch depth at {budget:,} counters per class, {len(words):,} distinct words:")
+    for depth in depths:
+        hashed = HashedNaiveBayesSpamFilter(n_buckets=budget // depth, depth=depth)
+        hashed.train(emails, labels)
+        estimates = hashed.spam_word_counts[np.arange(depth)[:, None], hashed.buckets(words)].min(axis=0)
+        error = estimates - true_counts
+        print(f"  depth {depth} x {budget // depth:>7}: mean over-estimate {error.mean():.4f}, "
+              f"{np.mean(error > 0):.2%} of words over-counted")
+
+
+if __name__ == "__main__":
+    benchmark_classification()
+    benchmark_training()
+    benchmark_cold_start()
+    benchmark_hashing()
+    benchmark_sketch_depth()
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from streaming_cov import StreamingCovariance
 
 #Dataset
 data = {
@@ -28,4 +29,10 @@ cov_YZ = cov_matrix_YZ[0][1]
 print("Covariance Matrix between Study Hours and Exam Score", "\n" , cov_matrix_XZ, "\n")
 print("Covariance between Study Hours and Exam Score", "\n",  cov_XZ, "\n")
 print("Covariance Matrix between Class Attendance and Exam Score", "\n", cov_matrix_YZ, "\n")
-print("Covariance between Class Attendance and Exam Score", "\n", cov_YZ, "\n")
\ No newline at end of file
+print("Covariance between Class Attendance and Exam Score", "\n", cov_YZ, "\n")
+
+#Full covariance matrix in one pass (the same code streams multi-GB CSVs, see streaming_cov.py)
+columns = ['Study Hours (X)', 'Class Attendance (Y)', 'Exam Score (Z)']
+stats = StreamingCovariance(columns).update(df)
+print("Covariance Matrix of all variables", "\n", stats.covariance(), "\n")
+print("Correlation Matrix of all variables", "\n", stats.correlation(), "\n")
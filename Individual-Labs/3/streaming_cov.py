@@ -0,0 +1,134 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class StreamingCovariance:
+    """
+    One-pass covariance of every column pair, with constant memory in the number of rows
+
+    Keeps the count, the column means and the matrix of co-moments
+    sum((x - mean_x) * (y - mean_y)). Batches are folded in with the pairwise
+    (Chan et al.) form of Welford's update, so two partial results merge exactly.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    def _combine(self, n, mean, comoment):
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean += delta * (n / total)
+        self.n = total
+
+    def update(self, batch):
+        """Fold a (rows x columns) array or DataFrame into the running statistics"""
+        if isinstance(batch, pd.DataFrame):
+            batch = batch[self.columns].to_numpy(dtype=np.float64)
+        batch = np.asarray(batch, dtype=np.float64)
+        if len(batch) == 0:
+            return self
+
+        mean = batch.mean(axis=0)
+        centered = batch - mean
+        self._combine(len(batch), mean, centered.T @ centered)
+        return self
+
+    def merge(self, other):
+        """Combine statistics computed on a disjoint set of rows"""
+        if other.columns != self.columns:
+            raise ValueError("Can only merge covariances over the same columns")
+        self._combine(other.n, other.mean, other.comoment)
+        return self
+
+    def covariance(self, ddof=1):
+        """Covariance matrix as a DataFrame; ddof=1 matches np.cov and DataFrame.cov"""
+        return pd.DataFrame(self.comoment / (self.n - ddof), index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson correlation matrix as a DataFrame"""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = self.comoment / np.outer(std, std)
+        return pd.DataFrame(values, index=self.columns, columns=self.columns)
+
+
+def covariance_from_csv(path, columns=None, chunksize=100_000):
+    """Stream a CSV through StreamingCovariance chunk by chunk"""
+    stats = None
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+        if stats is None:
+            stats = StreamingCovariance(columns or chunk.columns)
+        stats.update(chunk)
+    return stats
+
+
+def _covariance_of_byte_range(path, start, end, names, columns, chunk_lines):
+    """Worker: covariance of the CSV lines that begin inside [start, end)"""
+    stats = StreamingCovariance(columns)
+    with open(path, 'rb') as f:
+        if start > 0:
+            # A line straddling start belongs to the previous range
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        else:
+            f.seek(0)
+        lines = []
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+            if len(lines) == chunk_lines:
+                stats.update(_parse_lines(lines, names, columns))
+                lines = []
+        if lines:
+            stats.update(_parse_lines(lines, names, columns))
+    return stats
+
+
+def _parse_lines(lines, names, columns):
+    return pd.read_csv(io.BytesIO(b''.join(lines)), header=None, names=names, usecols=columns)
+
+
+def parallel_covariance_from_csv(path, columns=None, processes=None, chunk_lines=100_000):
+    """
+    Split a CSV into byte ranges, stream each in its own process and merge the partial results
+
+    Args:
+        path (str): CSV file with a header row
+        columns (list): Numeric columns to include; None uses every column
+        processes (int): Worker processes; None uses every core
+        chunk_lines (int): Lines parsed at a time inside a worker
+
+    Returns:
+        StreamingCovariance: Statistics over every row of the file
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+    names = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    columns = list(columns or names)
+
+    processes = processes or os.cpu_count()
+    size = os.path.getsize(path)
+    bounds = np.linspace(data_start, size, processes + 1).astype(np.int64)
+
+    stats = StreamingCovariance(columns)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_covariance_of_byte_range, path, int(start), int(end), names, columns, chunk_lines)
+                   for start, end in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
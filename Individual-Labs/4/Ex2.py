@@ -6,7 +6,6 @@ class Node:
         self.name = name
         self.parents = []
         self.children = []
-        self.observed = False
 
 
 def create_bayesian_network():
@@ -33,9 +32,7 @@ def bayes_ball(start, target, nodes, observed_nodes):
     queue = deque([(start, "down")])  # Start ball from the start node in the down direction
     visited = set()
 
-    # Mark observed nodes
-    for obs in observed_nodes:
-        nodes[obs].observed = True
+    observed = frozenset(observed_nodes)
 
     while queue:
         current, direction = queue.popleft()
@@ -51,7 +48,7 @@ def bayes_ball(start, target, nodes, observed_nodes):
         # Propagate the ball
         if direction == "down":
             # Move to children (if current node is not observed)
-            if not current.observed:
+            if current.name not in observed:
                 for child in current.children:
                     queue.append((child, "down"))
             # Move to parents
@@ -60,11 +57,11 @@ def bayes_ball(start, target, nodes, observed_nodes):
 
         elif direction == "up":
             # If current is a collider and observed, continue propagating
-            if current.observed:
+            if current.name in observed:
                 for child in current.children:
                     queue.append((child, "down"))
             # Move to parents
-            if not current.observed:
+            if current.name not in observed:
                 for parent in current.parents:
                     queue.append((parent, "up"))
 
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from Ex5 import Node, bayes_ball as node_bayes_ball
+from compiled_graph import CompiledDAG, EvidenceIndex, bayes_ball, d_connected, independence_matrix
+from loader import load_network
+
+
+def random_network(n_nodes=20000, avg_parents=2, seed=0):
+    """Random DAG as (parent, child) name pairs; edges always point to a higher id"""
+    rng = np.random.default_rng(seed)
+    edges = []
+    for child in range(1, n_nodes):
+        n_parents = min(child, rng.poisson(avg_parents))
+        for parent in rng.choice(child, size=n_parents, replace=False):
+            edges.append((f"N{parent}", f"N{child}"))
+    return [f"N{i}" for i in range(n_nodes)], edges
+
+
+def build_nodes(names, edges):
+    nodes = {name: Node(name) for name in names}
+    for parent, child in edges:
+        nodes[parent].children.append(nodes[child])
+        nodes[child].parents.append(nodes[parent])
+    return nodes
+
+
+def benchmark_bayes_ball(n_nodes=20000, n_queries=200, n_observed=50, seed=0):
+    names, edges = random_network(n_nodes, seed=seed)
+    nodes = build_nodes(names, edges)
+    graph = CompiledDAG.from_nodes(nodes)
+
+    rng = np.random.default_rng(seed)
+    observed = [names[i] for i in rng.choice(n_nodes, size=n_observed, replace=False)]
+    queries = [(names[a], names[b]) for a, b in rng.integers(0, n_nodes, size=(n_queries, 2))]
+
+    start = time.perf_counter()
+    for a, b in queries:
+        node_bayes_ball(nodes[a], nodes[b], nodes, observed)
+    node_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for a, b in queries:
+        bayes_ball(graph, a, b, observed)
+    compiled_time = time.perf_counter() - start
+
+    print(f"{n_nodes:,} nodes, {len(edges):,} edges, {n_observed} observed, {n_queries} queries")
+    print(f"Node-based bayes_ball: {node_time / n_queries * 1000:8.2f} ms/query")
+    print(f"CSR bayes_ball:        {compiled_time / n_queries * 1000:8.2f} ms/query "
+          f"({node_time / compiled_time:.1f}x)")
+
+
+def benchmark_d_separation(n_nodes=2000, n_observed=50, seed=0):
+    names, edges = random_network(n_nodes, seed=seed)
+    graph = CompiledDAG.from_edges(edges, names)
+    rng = np.random.default_rng(seed)
+    observed = [names[i] for i in rng.choice(n_nodes, size=n_observed, replace=False)]
+    source = next(name for name in names if name not in observed)
+
+    start = time.perf_counter()
+    pairwise = [bayes_ball(graph, source, name, observed) for name in graph.names]
+    pairwise_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    connected = d_connected(graph, [source], observed)
+    single_time = time.perf_counter() - start
+    assert all(connected[idx] != pairwise[idx] for idx, name in enumerate(graph.names) if name not in observed)
+
+    start = time.perf_counter()
+    independence_matrix(graph, observed)
+    matrix_time = time.perf_counter() - start
+
+    print(f"Nodes d-separated from {source}, {n_nodes:,} nodes: {n_nodes:,} pairwise queries "
+          f"{pairwise_time * 1000:.0f} ms, one d_connected pass {single_time * 1000:.2f} ms")
+    print(f"All-pairs independence matrix: {matrix_time:.2f} s")
+
+
+def benchmark_evidence_index(n_nodes=20000, n_queries=200, n_observed=2000, seed=0):
+    names, edges = random_network(n_nodes, seed=seed)
+    graph = CompiledDAG.from_edges(edges, names)
+    rng = np.random.default_rng(seed)
+    observed = rng.choice(n_nodes, size=n_observed, replace=False).tolist()
+    queries = rng.integers(0, n_nodes, size=(n_queries, 2)).tolist()
+
+    plain = [bayes_ball(graph, a, b, observed) for a, b in queries]
+
+    index = EvidenceIndex(graph, observed)
+    indexed = [index.d_separated(a, b) for a, b in queries]
+    assert indexed == plain
+    print(f"{n_observed:,} observed nodes, index built in {index.build_time * 1000:.1f} ms")
+
+    # The index only prunes when the target is an ancestor of the evidence; other queries fall back to bayes_ball
+    ancestor_queries = [(a, b) for a, b in queries if index.ancestors[b]]
+    other_queries = [(a, b) for a, b in queries if not index.ancestors[b]]
+    for label, group in (('ancestor targets', ancestor_queries), ('other targets', other_queries)):
+        if not group:
+            continue
+        start = time.perf_counter()
+        for a, b in group:
+            bayes_ball(graph, a, b, observed)
+        plain_ms = (time.perf_counter() - start) / len(group) * 1000
+        start = time.perf_counter()
+        for a, b in group:
+            index.d_separated(a, b)
+        indexed_ms = (time.perf_counter() - start) / len(group) * 1000
+        print(f"  {label} ({len(group)} queries): bayes_ball {plain_ms:.2f} ms/query, indexed {indexed_ms:.2f} ms/query")
+
+    stats = index.stats()
+    print(f"  {stats['queries']} queries, {stats['indexed']} through the ancestral pruning "
+          f"({stats['mean_expanded']:.0f} expansions, {stats['mean_pruned']:.0f} pruned branches each)")
+
+
+def benchmark_loader(n_nodes=50000, seed=0):
+    names, edges = random_network(n_nodes, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'network.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{parent} {child}\n" for parent, child in edges)
+
+        start = time.perf_counter()
+        first = load_network(path)
+        first_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cached = load_network(path)
+        cached_time = time.perf_counter() - start
+
+    assert cached.names == first.names and np.array_equal(cached.child_idx, first.child_idx)
+    print(f"Loading {len(edges):,} edges: first run {first_time * 1000:.0f} ms, "
+          f"cached {cached_time * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_bayes_ball()
+    benchmark_d_separation()
+    benchmark_evidence_index()
+    benchmark_loader()
@@ -0,0 +1,463 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+class CompiledDAG:
+    """
+    Bayesian network structure with integer node ids
+
+    Parents and children are stored in CSR form: the parents of node i are
+    parent_idx[parent_ptr[i]:parent_ptr[i + 1]] (children likewise). The NumPy
+    arrays are the canonical storage; flat Python lists of the same data are
+    kept for the traversal loops, where they index faster than NumPy scalars.
+
+    The structure only changes through add_edges(), which recompiles the arrays,
+    bumps `version` and empties the d-separation query cache.
+    """
+
+    def __init__(self, names, sources, targets, cache_size=65536):
+        self.names = list(names)
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+        self.version = 0
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._compile(sources, targets, len(self.names))
+
+    def _compile(self, sources, targets, n):
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        self.parent_ptr, self.parent_idx = self._csr(targets, sources, n)
+        self.child_ptr, self.child_idx = self._csr(sources, targets, n)
+        self._lists()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; worker processes start with an empty cache
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _csr(rows, cols, n):
+        order = np.argsort(rows, kind='stable')
+        ptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=n), out=ptr[1:])
+        return ptr, cols[order].astype(np.int32)
+
+    def _lists(self):
+        # One tuple, swapped in a single assignment, so concurrent readers never see a half-updated graph
+        self._adjacency = (self.parent_ptr.tolist(), self.parent_idx.tolist(),
+                           self.child_ptr.tolist(), self.child_idx.tolist())
+
+    def edges(self):
+        """(sources, targets) id arrays of every edge"""
+        sources = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.child_ptr))
+        return sources, self.child_idx
+
+    def add_edges(self, edges):
+        """Add (parent, child) edges by name, creating unknown nodes; invalidates cached queries"""
+        with self._lock:
+            sources, targets = self.edges()
+            names, index = list(self.names), dict(self.index)
+            new_sources, new_targets = [], []
+            for parent, child in edges:
+                for name in (parent, child):
+                    if name not in index:
+                        index[name] = len(names)
+                        names.append(name)
+                new_sources.append(index[parent])
+                new_targets.append(index[child])
+
+            self._compile(np.concatenate([sources, new_sources]).astype(np.int32),
+                          np.concatenate([targets, new_targets]).astype(np.int32), len(names))
+            # New names go live after the adjacency that covers them, so any id a reader
+            # can look up is inside the adjacency snapshot it takes afterwards
+            self.names, self.index = names, index
+            self.version += 1
+            self._cache.clear()
+
+    def add_edge(self, parent, child):
+        self.add_edges([(parent, child)])
+
+    def topological_order(self):
+        """
+        Node ids in topological order (Kahn's algorithm over the CSR arrays)
+
+        Raises:
+            ValueError: if the graph has a directed cycle
+        """
+        _, _, child_ptr, child_idx = self._adjacency
+        in_degree = np.diff(self.parent_ptr).tolist()
+        order = [idx for idx, degree in enumerate(in_degree) if degree == 0]
+        for current in order:
+            for child in child_idx[child_ptr[current]:child_ptr[current + 1]]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    order.append(child)
+
+        if len(order) < len(self):
+            on_cycle = [self.names[idx] for idx, degree in enumerate(in_degree) if degree > 0]
+            raise ValueError(f"Graph is not a DAG; cycle through {', '.join(on_cycle[:5])}")
+        return order
+
+    def cache_get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def cache_put(self, key, value):
+        with self._lock:
+            # Drop results computed against a structure that changed mid-query
+            if key[0] != self.version:
+                return
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """Compile a {name: Node} network as built by create_bayesian_network()"""
+        names = list(nodes)
+        index = {name: idx for idx, name in enumerate(names)}
+        sources, targets = [], []
+        for name, node in nodes.items():
+            for child in node.children:
+                sources.append(index[name])
+                targets.append(index[child.name])
+        return cls(names, sources, targets)
+
+    @classmethod
+    def from_edges(cls, edges, names=()):
+        """Compile from (parent name, child name) pairs; names adds nodes without edges"""
+        index = {name: idx for idx, name in enumerate(names)}
+        sources, targets = [], []
+        for parent, child in edges:
+            sources.append(index.setdefault(parent, len(index)))
+            targets.append(index.setdefault(child, len(index)))
+        return cls(list(index), sources, targets)
+
+    def __len__(self):
+        return len(self.names)
+
+    def node_id(self, node):
+        """Accept a node id, a node name or a Node object"""
+        if isinstance(node, (int, np.integer)):
+            return int(node)
+        return self.index[getattr(node, 'name', node)]
+
+    def parents(self, node):
+        idx = self.node_id(node)
+        return self.parent_idx[self.parent_ptr[idx]:self.parent_ptr[idx + 1]]
+
+    def children(self, node):
+        idx = self.node_id(node)
+        return self.child_idx[self.child_ptr[idx]:self.child_ptr[idx + 1]]
+
+
+def _bayes_ball(adjacency, starts, observed, target=-1):
+    """
+    Bayes-Ball (Shachter, 1998) from every node in starts at once
+
+    The ball starts at each source as if it arrived from a child. An unobserved
+    node reached from a child passes it to its parents and children; reached from
+    a parent it passes it on to its children. An observed node only bounces a ball
+    arriving from a parent back up to its parents. Each node is expanded at most
+    once per direction, tracked in two preallocated bitmaps, so one call is
+    linear in the size of the graph.
+
+    adjacency is one snapshot of CompiledDAG._adjacency, taken by the caller after
+    resolving node ids and used for the whole query, observed bitmap included.
+
+    Returns:
+        tuple: (target reached, bottom bitmap); the unobserved nodes marked in
+        bottom are exactly the nodes d-connected to starts
+    """
+    parent_ptr, parent_idx, child_ptr, child_idx = adjacency
+    n = len(parent_ptr) - 1
+    top = bytearray(n)     # parents already visited
+    bottom = bytearray(n)  # children already visited
+
+    # Stack entries are 2 * node + 1 when the ball arrived from a child, 2 * node from a parent
+    stack = [2 * start + 1 for start in starts]
+    while stack:
+        entry = stack.pop()
+        current = entry >> 1
+
+        if observed[current]:
+            if not entry & 1 and not top[current]:
+                top[current] = 1
+                stack.extend(2 * parent + 1 for parent in parent_idx[parent_ptr[current]:parent_ptr[current + 1]])
+            continue
+
+        # The ball reached an unobserved node, so it is d-connected to the starts
+        if current == target:
+            return True, bottom
+
+        if entry & 1 and not top[current]:
+            top[current] = 1
+            stack.extend(2 * parent + 1 for parent in parent_idx[parent_ptr[current]:parent_ptr[current + 1]])
+        if not bottom[current]:
+            bottom[current] = 1
+            stack.extend(2 * child for child in child_idx[child_ptr[current]:child_ptr[current + 1]])
+
+    return False, bottom
+
+
+def _observed_bitmap(adjacency, observed_ids):
+    observed = bytearray(len(adjacency[0]) - 1)
+    for idx in observed_ids:
+        observed[idx] = 1
+    return observed
+
+
+def bayes_ball(graph, start, target, observed_nodes=()):
+    """
+    Drop-in counterpart of the Ex*.py bayes_ball for a CompiledDAG; nodes may be ids, names or Node objects
+
+    Like those, it is stateless: evidence lives in a per-call observed set (a bitmap
+    here, a frozenset in Ex*.py) instead of flags on the nodes, so the shared graph
+    is never mutated and repeated or concurrent queries cannot leak evidence into
+    each other.
+
+    Returns:
+        bool: True if start and target are d-separated given observed_nodes
+    """
+    start, target = graph.node_id(start), graph.node_id(target)
+    observed_ids = [graph.node_id(node) for node in observed_nodes]
+    adjacency = graph._adjacency
+    reached, _ = _bayes_ball(adjacency, [start], _observed_bitmap(adjacency, observed_ids), target)
+    return not reached
+
+
+def cached_bayes_ball(graph, start, target, observed_nodes=()):
+    """
+    Thread-safe, memoized bayes_ball
+
+    Results are kept in the graph's LRU cache keyed on
+    (graph version, unordered {start, target}, frozenset(evidence)); d-separation is
+    symmetric, so (A, B) and (B, A) share an entry. Adding edges bumps the version,
+    which invalidates every cached answer.
+    """
+    version = graph.version
+    start, target = graph.node_id(start), graph.node_id(target)
+    evidence = frozenset(graph.node_id(node) for node in observed_nodes)
+    key = (version, min(start, target), max(start, target), evidence)
+
+    result = graph.cache_get(key)
+    if result is None:
+        result = bayes_ball(graph, start, target, evidence)
+        graph.cache_put(key, result)
+    return result
+
+
+def d_connected(graph, sources, observed_nodes=()):
+    """
+    Every node d-connected to at least one of sources given observed_nodes, in one linear pass
+
+    Returns:
+        np.ndarray: Boolean mask over node ids; unobserved sources are included,
+        observed nodes never are
+    """
+    return _d_connected(graph, sources, observed_nodes)[0]
+
+
+def _d_connected(graph, sources, observed_nodes):
+    """d_connected mask and the observed mask, both over the same adjacency snapshot"""
+    starts = [graph.node_id(source) for source in sources]
+    observed_ids = [graph.node_id(node) for node in observed_nodes]
+    adjacency = graph._adjacency
+    observed = _observed_bitmap(adjacency, observed_ids)
+    _, bottom = _bayes_ball(adjacency, starts, observed)
+    return np.frombuffer(bottom, dtype=np.bool_), np.frombuffer(observed, dtype=np.bool_)
+
+
+def d_separated_from(graph, sources, observed_nodes=()):
+    """Names of the unobserved nodes d-separated from every source given observed_nodes"""
+    connected, observed = _d_connected(graph, sources, observed_nodes)
+    names = graph.names
+    return [names[idx] for idx in np.flatnonzero(~connected & ~observed)]
+
+
+class EvidenceIndex:
+    """
+    Ancestral closure of one evidence set, precomputed once and reused across queries
+
+    `ancestors` marks the observed nodes and all of their ancestors. With it a ball
+    arriving from a parent at an ancestor of the evidence can go straight back up
+    (a collider with an observed descendant is active) without walking down to find
+    that descendant. A ball that moves down out of the ancestral set can never come
+    back up, so single-target queries whose target is an ancestor of the evidence
+    skip those branches entirely. Every other query gains nothing from the closure
+    and runs the plain _bayes_ball over the index's observed bitmap instead.
+
+    Timing and traversal counters are kept for tuning: see stats(). An index is shared
+    between threads through evidence_index(), so they are updated under a lock.
+    """
+
+    def __init__(self, graph, observed_nodes=()):
+        begin = time.perf_counter()
+        self.graph = graph
+        self.version = graph.version
+        stack = [graph.node_id(node) for node in observed_nodes]
+        self._adjacency = graph._adjacency
+        parent_ptr, parent_idx, _, _ = self._adjacency
+
+        self.observed = _observed_bitmap(self._adjacency, stack)
+
+        self.ancestors = bytearray(self.observed)
+        while stack:
+            current = stack.pop()
+            for parent in parent_idx[parent_ptr[current]:parent_ptr[current + 1]]:
+                if not self.ancestors[parent]:
+                    self.ancestors[parent] = 1
+                    stack.append(parent)
+
+        self.build_time = time.perf_counter() - begin
+        self.queries = 0
+        self.indexed = 0
+        self.query_time = 0.0
+        self.expanded = 0
+        self.pruned = 0
+        self._stats_lock = threading.Lock()
+
+    def _record(self, begin, indexed=False, expanded=0, pruned=0):
+        with self._stats_lock:
+            self.queries += 1
+            self.indexed += indexed
+            self.query_time += time.perf_counter() - begin
+            self.expanded += expanded
+            self.pruned += pruned
+
+    def _traverse(self, start, target):
+        """Bayes-Ball from start that never leaves the ancestral set; target must be inside it"""
+        begin = time.perf_counter()
+        parent_ptr, parent_idx, child_ptr, child_idx = self._adjacency
+        n = len(parent_ptr) - 1
+        observed, ancestors = self.observed, self.ancestors
+        top = bytearray(n)
+        bottom = bytearray(n)
+        expanded = pruned = 0
+        found = False
+
+        stack = [2 * start + 1]
+        while stack:
+            entry = stack.pop()
+            current = entry >> 1
+            expanded += 1
+
+            if not observed[current]:
+                if current == target:
+                    found = True
+                    break
+                if not bottom[current]:
+                    bottom[current] = 1
+                    for child in child_idx[child_ptr[current]:child_ptr[current + 1]]:
+                        if ancestors[child]:
+                            stack.append(2 * child)
+                        else:
+                            pruned += 1
+
+            # From a child through any unobserved node, or from a parent into an active collider
+            if (entry & 1 and not observed[current]) or (not entry & 1 and ancestors[current]):
+                if not top[current]:
+                    top[current] = 1
+                    stack.extend(2 * parent + 1 for parent in parent_idx[parent_ptr[current]:parent_ptr[current + 1]])
+
+        self._record(begin, True, expanded, pruned)
+        return found
+
+    def d_separated(self, start, target):
+        start, target = self.graph.node_id(start), self.graph.node_id(target)
+        if self.ancestors[target]:
+            return not self._traverse(start, target)
+        begin = time.perf_counter()
+        found, _ = _bayes_ball(self._adjacency, [start], self.observed, target)
+        self._record(begin)
+        return not found
+
+    def d_connected(self, sources):
+        """Same result as the module-level d_connected, for this index's evidence"""
+        begin = time.perf_counter()
+        _, bottom = _bayes_ball(self._adjacency, [self.graph.node_id(source) for source in sources], self.observed)
+        self._record(begin)
+        return np.frombuffer(bottom, dtype=np.bool_)
+
+    def stats(self):
+        """Query counts and mean time; expansions and pruned branches are per indexed query"""
+        with self._stats_lock:
+            indexed = max(self.indexed, 1)
+            return {
+                'build_ms': self.build_time * 1000,
+                'queries': self.queries,
+                'indexed': self.indexed,
+                'mean_query_ms': self.query_time / max(self.queries, 1) * 1000,
+                'mean_expanded': self.expanded / indexed,
+                'mean_pruned': self.pruned / indexed,
+            }
+
+
+def evidence_index(graph, observed_nodes=()):
+    """EvidenceIndex for this evidence set, shared through the graph's cache until the structure changes"""
+    key = (graph.version, 'evidence', frozenset(graph.node_id(node) for node in observed_nodes))
+    index = graph.cache_get(key)
+    if index is None:
+        index = EvidenceIndex(graph, key[2])
+        graph.cache_put(key, index)
+    return index
+
+
+def indexed_bayes_ball(graph, start, target, observed_nodes=()):
+    """bayes_ball through the precomputed ancestral-closure index of observed_nodes"""
+    return evidence_index(graph, observed_nodes).d_separated(start, target)
+
+
+_worker_adjacency = None
+_worker_observed = None
+
+
+def _init_worker(adjacency, observed):
+    global _worker_adjacency, _worker_observed
+    _worker_adjacency, _worker_observed = adjacency, observed
+
+
+def _connected_rows(sources):
+    rows = np.empty((len(sources), len(_worker_observed)), dtype=np.bool_)
+    for row, source in enumerate(sources):
+        _, bottom = _bayes_ball(_worker_adjacency, [source], _worker_observed)
+        rows[row] = np.frombuffer(bottom, dtype=np.bool_)
+    return np.packbits(rows, axis=1)
+
+
+def independence_matrix(graph, observed_nodes=(), processes=None, chunk_size=256):
+    """
+    All-pairs d-separation given observed_nodes, one Bayes-Ball pass per node, spread over a process pool
+
+    Memory is n * n bytes for the result; rows travel back from the workers bit-packed.
+
+    Returns:
+        np.ndarray: (n, n) boolean matrix, True where the pair is d-separated.
+        Rows and columns of observed nodes are all True.
+    """
+    observed_ids = [graph.node_id(node) for node in observed_nodes]
+    adjacency = graph._adjacency
+    observed = _observed_bitmap(adjacency, observed_ids)
+    n = len(observed)
+    independent = np.empty((n, n), dtype=np.bool_)
+
+    chunks = [list(range(start, min(start + chunk_size, n))) for start in range(0, n, chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(adjacency, observed)) as pool:
+        for chunk, packed in zip(chunks, pool.map(_connected_rows, chunks)):
+            independent[chunk[0]:chunk[-1] + 1] = ~np.unpackbits(packed, axis=1, count=n).astype(np.bool_)
+    return independent
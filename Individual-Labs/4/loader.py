@@ -0,0 +1,142 @@
+import os
+import re
+import sys
+from array import array
+
+import numpy as np
+
+from compiled_graph import CompiledDAG, bayes_ball
+
+CACHE_SUFFIX = '.dagcache.npz'
+
+BIF_VARIABLE = re.compile(r'^\s*variable\s+([^\s{]+)')
+BIF_PROBABILITY = re.compile(r'^\s*probability\s*\(\s*([^|)\s]+)\s*(?:\|([^)]*))?\)')
+
+
+def read_edge_list(path):
+    """
+    Stream (parent, child) pairs from an edge-list file
+
+    One edge per line, written 'parent child', 'parent,child', 'parent<TAB>child' or
+    'parent -> child'. Blank lines and lines starting with '#' are skipped; a line with
+    a single name declares a node without edges as (name, None).
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if '->' in line:
+                fields = [field.strip() for field in line.split('->')]
+            elif ',' in line or '\t' in line:
+                fields = [field.strip() for field in re.split(r'[,\t]', line)]
+            else:
+                fields = line.split()
+
+            if len(fields) == 1:
+                yield fields[0], None
+            elif len(fields) == 2:
+                yield fields[0], fields[1]
+            else:
+                raise ValueError(f"{path}: cannot parse edge {line!r}")
+
+
+def read_bif(path):
+    """
+    Stream (parent, child) pairs from the structure of a BIF file
+
+    Only 'variable' and 'probability ( child | parents )' headers are read; the
+    probability tables themselves are skipped line by line. Variables are yielded
+    as (name, None) so nodes without parents are kept.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = BIF_VARIABLE.match(line)
+            if match:
+                yield match.group(1), None
+                continue
+            match = BIF_PROBABILITY.match(line)
+            if match and match.group(2):
+                child = match.group(1)
+                for parent in match.group(2).split(','):
+                    yield parent.strip(), child
+
+
+def compile_edges(pairs):
+    """Build a CompiledDAG from streamed (parent, child) pairs, keeping only ids and flat int arrays"""
+    index = {}
+    sources, targets = array('i'), array('i')
+    for parent, child in pairs:
+        parent_id = index.setdefault(parent, len(index))
+        if child is not None:
+            sources.append(parent_id)
+            targets.append(index.setdefault(child, len(index)))
+
+    return CompiledDAG(index, np.frombuffer(sources, dtype=np.int32), np.frombuffer(targets, dtype=np.int32))
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def _read_cache(path):
+    cache_path = path + CACHE_SUFFIX
+    if not os.path.exists(cache_path):
+        return None
+    with np.load(cache_path) as cache:
+        if not np.array_equal(cache['signature'], _source_signature(path)):
+            return None
+        return CompiledDAG(cache['names'].tolist(), cache['sources'], cache['targets'])
+
+
+def _write_cache(path, graph):
+    sources, targets = graph.edges()
+    try:
+        with open(path + CACHE_SUFFIX, 'wb') as f:
+            np.savez(f, signature=_source_signature(path), names=np.array(graph.names),
+                     sources=sources, targets=targets)
+    except OSError:
+        # A read-only model directory only costs the speedup on the next run
+        pass
+
+
+def load_network(path, use_cache=True):
+    """
+    Load a Bayes-Ball graph from an edge-list or .bif file
+
+    The compiled graph is cached next to the file (path + '.dagcache.npz') and reused
+    while the source file's size and modification time are unchanged.
+
+    Raises:
+        ValueError: if the network contains a directed cycle
+    """
+    if use_cache:
+        graph = _read_cache(path)
+        if graph is not None:
+            return graph
+
+    reader = read_bif if path.lower().endswith('.bif') else read_edge_list
+    graph = compile_edges(reader(path))
+    graph.topological_order()
+
+    if use_cache:
+        _write_cache(path, graph)
+    return graph
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python loader.py <network.bif | edges.txt> <start> <target> [observed ...]")
+        return
+
+    graph = load_network(sys.argv[1])
+    start, target, observed_nodes = sys.argv[2], sys.argv[3], sys.argv[4:]
+    independent = bayes_ball(graph, start, target, observed_nodes)
+
+    given = f" given {', '.join(observed_nodes)}" if observed_nodes else ""
+    print(f"{start} and {target} are {'independent' if independent else 'dependent'}{given}.")
+
+
+if __name__ == "__main__":
+    main()
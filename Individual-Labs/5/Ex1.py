@@ -1,3 +1,5 @@
+from enumeration import EnumerationEngine
+
 #Drawing of Bayesian Network
 
 # W---->A---->C<----E
@@ -6,6 +8,8 @@ class BayesianNetwork:
     def __init__(self, cpt):
         # Initialize the Bayesian Network with Conditional Probability Tables (CPT).
         self.cpt = cpt
+        # Exact query() / query_batch() for any variable, from CPT tensors parsed once
+        self.engine = EnumerationEngine(cpt)
 
     def probability_of_congestion(self, evidence):
         # Calculate P(C=True | W=True, E=True)
@@ -24,6 +28,12 @@ class BayesianNetwork:
         P_C = P_A * P_C_given_E_A + (1 - P_A) * P_C_given_E_not_A
         return P_C
 
+    def query(self, variable, evidence=None):
+        return self.engine.query(variable, evidence)
+
+    def query_batch(self, variable, evidence):
+        return self.engine.query_batch(variable, evidence)
+
 # Example CPT data
 cpt_data = {
     "P(W=True)": 0.3,
@@ -36,15 +46,21 @@ cpt_data = {
     "P(C=True|E=False,A=False)": 0.2
 }
 
-# Define evidence: it's raining and there's a major event in the city
-evidence = {
-    "W": True,
-    "E": True
-}
 
-# Initialize the Bayesian Network with the loaded CPT
-bn = BayesianNetwork(cpt_data)
+if __name__ == "__main__":
+    # Define evidence: it's raining and there's a major event in the city
+    evidence = {
+        "W": True,
+        "E": True
+    }
+
+    # Initialize the Bayesian Network with the loaded CPT
+    bn = BayesianNetwork(cpt_data)
+
+    # Calculate the probability of congestion given the evidence
+    probability_congestion = bn.probability_of_congestion(evidence)
+    print(f"Probability of Congestion given that it is raining and there is a major event: {probability_congestion:.2f}")
 
-# Calculate the probability of congestion given the evidence
-probability_congestion = bn.probability_of_congestion(evidence)
-print(f"Probability of Congestion given that it is raining and there is a major event: {probability_congestion:.2f}")
+    # Any query on the same network via exact enumeration
+    posterior_accident = bn.query("A", {"C": True, "E": True})
+    print(f"P(A=True | C=True, E=True) by enumeration: {posterior_accident['True']:.2f}")
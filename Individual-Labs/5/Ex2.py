@@ -1,8 +1,13 @@
+from enumeration import EnumerationEngine
+
+
 class BayesianNetwork:
     def __init__(self, cpt):
         # Initialize the Bayesian Network with Conditional Probability Tables (CPT).
 
         self.cpt = cpt
+        # Exact query() / query_batch() for any variable, from CPT tensors parsed once
+        self.engine = EnumerationEngine(cpt)
 
     def probability_of_admission(self, evidence):
         # Calculate P(A=a^1 | I=i^1, S=s^1, E=e^1)
@@ -26,6 +31,12 @@ class BayesianNetwork:
         probability_admission = P_I * P_S_given_I * P_E * P_A1
         return probability_admission
 
+    def query(self, variable, evidence=None):
+        return self.engine.query(variable, evidence)
+
+    def query_batch(self, variable, evidence):
+        return self.engine.query_batch(variable, evidence)
+
 # Example CPT data
 cpt_data = {
     "P(E=e^0)": 0.7, "P(E=e^1)": 0.3,
@@ -40,16 +51,22 @@ cpt_data = {
     "P(A=a^0|M=m^1)": 0.9, "P(A=a^1|M=m^1)": 0.1
 }
 
-# Define the evidence: High IQ, High Aptitude Score, Difficult Exam
-evidence = {
-    "I": "i^1",
-    "S": "s^1",
-    "E": "e^1"
-}
 
-# Initialize the Bayesian Network with the loaded CPT
-bn = BayesianNetwork(cpt_data)
+if __name__ == "__main__":
+    # Define the evidence: High IQ, High Aptitude Score, Difficult Exam
+    evidence = {
+        "I": "i^1",
+        "S": "s^1",
+        "E": "e^1"
+    }
+
+    # Initialize the Bayesian Network with the loaded CPT
+    bn = BayesianNetwork(cpt_data)
+
+    # Calculate the probability of admission given the evidence
+    probability_admission = bn.probability_of_admission(evidence)
+    print(f"Probability of Admission given high IQ, high aptitude score, and difficult exam: {probability_admission:.2f}")
 
-# Calculate the probability of admission given the evidence
-probability_admission = bn.probability_of_admission(evidence)
-print(f"Probability of Admission given high IQ, high aptitude score, and difficult exam: {probability_admission:.2f}")
+    # Any query on the same network via exact enumeration
+    posterior_admission = bn.query("A", evidence)
+    print(f"P(A=a^1 | I=i^1, S=s^1, E=e^1) by enumeration: {posterior_admission['a^1']:.2f}")
@@ -0,0 +1,139 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Ex1 import BayesianNetwork as TrafficNetwork, cpt_data as traffic_cpt
+from Ex2 import cpt_data as admission_cpt
+from circuit import ArithmeticCircuit
+from encoding import network_from_pgmpy
+from enumeration import EnumerationEngine
+
+
+def benchmark_batch_queries(n_rows=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    evidence = {'W': rng.random(n_rows) < 0.3, 'E': rng.random(n_rows) < 0.2}
+    bn = TrafficNetwork(traffic_cpt)
+
+    n_loop = 20000
+    start = time.perf_counter()
+    looped = [bn.probability_of_congestion({'W': w, 'E': e})
+              for w, e in zip(evidence['W'][:n_loop].tolist(), evidence['E'][:n_loop].tolist())]
+    loop_rate = n_loop / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batched = bn.query_batch('C', evidence)
+    batch_rate = n_rows / (time.perf_counter() - start)
+    assert np.allclose(batched[:n_loop, 0], looped)
+
+    print(f"P(C | W, E): probability_of_congestion loop {loop_rate:,.0f} rows/sec, "
+          f"query_batch {batch_rate:,.0f} rows/sec")
+
+    engine = EnumerationEngine(admission_cpt)
+    evidence = {name: rng.choice(engine.values[name], n_rows) for name in ('I', 'S', 'E')}
+    start = time.perf_counter()
+    batched = engine.query_batch('A', evidence)
+    print(f"P(A | I, S, E): query_batch {n_rows / (time.perf_counter() - start):,.0f} rows/sec")
+    check_batch_matches_query(engine, 'A', evidence, batched)
+
+    # An observed query variable gives the same one-hot rows as query(); unknown names are rejected
+    observed = dict(evidence, A=rng.choice(engine.values['A'], n_rows))
+    check_batch_matches_query(engine, 'A', observed, engine.query_batch('A', observed))
+    unknown = dict(evidence, Z=evidence['I'])
+    for answer, observations in ((engine.query_batch, unknown),
+                                 (engine.query, {name: column[0] for name, column in unknown.items()})):
+        try:
+            answer('A', observations)
+        except ValueError:
+            continue
+        raise AssertionError(f"{answer.__name__} accepted the unknown evidence variable Z")
+
+
+def check_batch_matches_query(engine, variable, evidence, batched, n_checked=200):
+    """Assert the first rows of a query_batch result equal query() on the same evidence"""
+    for row in range(n_checked):
+        expected = engine.query(variable, {name: column[row] for name, column in evidence.items()})
+        assert np.allclose(batched[row], [expected[value] for value in engine.values[variable]], equal_nan=True)
+
+
+def per_query_ms(answer, queries):
+    start = time.perf_counter()
+    for query in queries:
+        answer(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def random_evidence(values, n_queries, rng):
+    """Evidence dicts observing a random half of the variables"""
+    variables = list(values)
+    queries = []
+    for _ in range(n_queries):
+        observed = rng.choice(variables, size=len(variables) // 2, replace=False)
+        queries.append({name: values[name][rng.integers(len(values[name]))] for name in observed})
+    return queries
+
+
+def check_circuit_evidence():
+    """Unknown evidence raises like EnumerationEngine, and integer states are matched by value, not position"""
+    engine = EnumerationEngine(admission_cpt)
+    circuit = ArithmeticCircuit.from_engine(engine)
+    for answer in (engine.query, circuit.query):
+        try:
+            answer('A', {'Z': 'x'})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{answer.__qualname__} should reject unknown evidence")
+
+    circuit = ArithmeticCircuit(['A', 'B'], {'A': [1, 2], 'B': ['b0', 'b1']}, {'A': [], 'B': ['A']},
+                                {'A': [0.3, 0.7], 'B': [[0.9, 0.1], [0.2, 0.8]]})
+    assert np.allclose(circuit.marginals_batch({'A': np.array([2, 1])})['B'], [[0.2, 0.8], [0.9, 0.1]])
+
+
+def benchmark_circuit(n_queries=500, seed=0):
+    rng = np.random.default_rng(seed)
+
+    engine = EnumerationEngine(admission_cpt)
+    circuit = ArithmeticCircuit.from_engine(engine)
+    queries = random_evidence(engine.values, n_queries, rng)
+    enumeration_ms = per_query_ms(lambda evidence: [engine.query(name, evidence) for name in engine.variables],
+                                  queries)
+    circuit_ms = per_query_ms(circuit.marginals, queries)
+    print(f"Lab 5 admission network, all marginals: enumeration {enumeration_ms:.3f} ms/query, "
+          f"circuit {circuit_ms:.3f} ms/query ({circuit.size()[0]} nodes)")
+
+    # Lab 10 student-performance network against pgmpy's VariableElimination
+    from main import StudentPerformanceCBN
+    from pgmpy.inference import VariableElimination
+
+    model = StudentPerformanceCBN().model
+    variables, values, parents, tables = network_from_pgmpy(model)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'student.npz')
+        start = time.perf_counter()
+        circuit = ArithmeticCircuit.compile_cached(variables, values, parents, tables, path)
+        compile_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        circuit = ArithmeticCircuit.compile_cached(variables, values, parents, tables, path)
+        cached_ms = (time.perf_counter() - start) * 1000
+
+    queries = [evidence for evidence in random_evidence(dict(zip(variables, values.values())), n_queries, rng)
+               if 'Performance' not in evidence]
+    inference = VariableElimination(model)
+    pgmpy_ms = per_query_ms(lambda evidence: inference.query(['Performance'], evidence=evidence,
+                                                             show_progress=False), queries)
+    circuit_ms = per_query_ms(lambda evidence: circuit.query('Performance', evidence), queries)
+    expected = inference.query(['Performance'], evidence=queries[0], show_progress=False).values
+    assert np.allclose(list(circuit.query('Performance', queries[0]).values()), expected)
+    print(f"Lab 10 student network, P(Performance | evidence): VariableElimination {pgmpy_ms:.3f} ms/query, "
+          f"circuit {circuit_ms:.3f} ms/query (compile {compile_ms:.1f} ms, cached load {cached_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    # Lab 10's student network
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '10'))
+    benchmark_batch_queries()
+    check_circuit_evidence()
+    benchmark_circuit()
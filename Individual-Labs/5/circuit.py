@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from encoding import encode_column, network_from_pgmpy
+
+ADD, MUL = 0, 1
+
+
+class ArithmeticCircuit:
+    """
+    A Bayesian network compiled into a flat arithmetic circuit (Darwiche, 2003)
+
+    The network polynomial sum_x prod theta_{x|u} * lambda_x is built by running
+    variable elimination symbolically: every factor cell is a circuit node id, and
+    multiplying or summing out factors appends whole groups of MUL/ADD nodes at once.
+    Node ids are topologically ordered and each group is stored as a (count, arity)
+    matrix of child ids, so evaluating the circuit is one pass over a few dozen NumPy
+    gathers. Evidence only changes the indicator leaves lambda; a backward pass gives
+    d f / d lambda_x = P(x, e) for every variable at once.
+    """
+
+    def __init__(self, variables, values, parents, tables):
+        self.variables = list(variables)
+        self.values = {variable: list(values[variable]) for variable in self.variables}
+        self.parents = {variable: list(parents[variable]) for variable in self.variables}
+        self.tables = {variable: np.asarray(tables[variable], dtype=np.float64) for variable in self.variables}
+        self.value_index = {variable: {str(value): idx for idx, value in enumerate(self.values[variable])}
+                            for variable in self.variables}
+        self.card = {variable: len(self.values[variable]) for variable in self.variables}
+        self.fingerprint = network_fingerprint(self.variables, self.values, self.parents, self.tables)
+
+        # Leaves: one indicator per (variable, value), then one parameter per CPT entry
+        self.indicator_offset = {}
+        n_indicators = 0
+        for variable in self.variables:
+            self.indicator_offset[variable] = n_indicators
+            n_indicators += self.card[variable]
+        self.n_indicators = n_indicators
+        self.params = np.concatenate([self.tables[variable].ravel() for variable in self.variables])
+        self.groups = []
+        self.n_nodes = self.n_indicators + len(self.params)
+        self._compile()
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Compile a Lab 5 EnumerationEngine network"""
+        return cls(engine.variables, engine.values, engine.parents, engine.tables)
+
+    @classmethod
+    def from_pgmpy(cls, model):
+        """Compile a pgmpy BayesianNetwork"""
+        return cls(*network_from_pgmpy(model))
+
+    def _add_group(self, kind, children):
+        children = np.ascontiguousarray(children, dtype=np.int64)
+        start = self.n_nodes
+        self.groups.append((kind, start, children))
+        self.n_nodes += len(children)
+        return np.arange(start, self.n_nodes)
+
+    def _compile(self):
+        factors = []
+        param_start = self.n_indicators
+        for variable in self.variables:
+            scope = self.parents[variable] + [variable]
+            table_shape = self.tables[variable].shape
+            param_ids = param_start + np.arange(int(np.prod(table_shape))).reshape(table_shape)
+            param_start += param_ids.size
+            indicator_ids = np.broadcast_to(
+                self.indicator_offset[variable] + np.arange(self.card[variable]), table_shape)
+            ids = self._add_group(MUL, np.stack([param_ids.ravel(), indicator_ids.ravel()], axis=1))
+            factors.append((scope, ids.reshape(table_shape)))
+
+        for variable in self._elimination_order():
+            involved = [factor for factor in factors if variable in factor[0]]
+            factors = [factor for factor in factors if variable not in factor[0]]
+
+            scope = []
+            for factor_scope, _ in involved:
+                scope.extend(name for name in factor_scope if name not in scope)
+            # Put the eliminated variable last so summing it out is a reshape
+            scope.remove(variable)
+            scope.append(variable)
+            shape = tuple(self.card[name] for name in scope)
+
+            if len(involved) == 1:
+                product = _align(involved[0], scope, shape)
+            else:
+                children = np.stack([_align(factor, scope, shape).ravel() for factor in involved], axis=1)
+                product = self._add_group(MUL, children).reshape(shape)
+
+            summed = self._add_group(ADD, product.reshape(-1, shape[-1]))
+            factors.append((scope[:-1], summed.reshape(shape[:-1])))
+
+        roots = [int(ids) for _, ids in factors]
+        self.root = roots[0] if len(roots) == 1 else int(self._add_group(MUL, [roots])[0])
+
+    def _elimination_order(self):
+        """Greedy min-weight order: always eliminate the variable whose product factor is smallest"""
+        scopes = [set(self.parents[variable]) | {variable} for variable in self.variables]
+        remaining = list(self.variables)
+        order = []
+        while remaining:
+            def weight(variable):
+                union = set().union(*(scope for scope in scopes if variable in scope))
+                return int(np.prod([self.card[name] for name in union]))
+
+            variable = min(remaining, key=weight)
+            union = set().union(*(scope for scope in scopes if variable in scope))
+            scopes = [scope for scope in scopes if variable not in scope] + [union - {variable}]
+            remaining.remove(variable)
+            order.append(variable)
+        return order
+
+    def size(self):
+        """(nodes, edges) of the compiled circuit"""
+        return self.n_nodes, sum(children.size for _, _, children in self.groups)
+
+    def encode(self, variable, value):
+        """Index of a value, matched by its string form as in EnumerationEngine.encode"""
+        try:
+            return self.value_index[variable][str(value)]
+        except KeyError:
+            raise ValueError(f"Unknown value {value!r} for variable {variable}") from None
+
+    def encode_column(self, variable, column):
+        """Vectorized encode() of a whole column of values"""
+        return encode_column(variable, column, self.encode)
+
+    def check_evidence(self, evidence):
+        unknown = [name for name in evidence if name not in self.card]
+        if unknown:
+            raise ValueError(f"Unknown evidence variables {unknown}")
+
+    def indicators(self, evidence, n_rows=None):
+        """
+        Indicator leaf values for a single evidence dict or for evidence columns
+
+        Returns:
+            np.ndarray: (n_indicators, rows)
+        """
+        self.check_evidence(evidence)
+        if n_rows is None:
+            evidence = {name: [value] for name, value in evidence.items()}
+            n_rows = 1
+        lambdas = np.ones((self.n_indicators, n_rows))
+        for variable in evidence:
+            offset = self.indicator_offset[variable]
+            lambdas[offset:offset + self.card[variable]] = \
+                np.arange(self.card[variable])[:, None] == self.encode_column(variable, evidence[variable])[None, :]
+        return lambdas
+
+    def forward(self, lambdas):
+        """Evaluate every node; returns the (n_nodes, rows) value matrix"""
+        values = np.empty((self.n_nodes, lambdas.shape[1]))
+        values[:self.n_indicators] = lambdas
+        values[self.n_indicators:self.n_indicators + len(self.params)] = self.params[:, None]
+        for kind, start, children in self.groups:
+            gathered = values[children]
+            values[start:start + len(children)] = gathered.sum(axis=1) if kind == ADD else gathered.prod(axis=1)
+        return values
+
+    def backward(self, values):
+        """d root / d node for every node, by reverse-mode differentiation of the flat circuit"""
+        grads = np.zeros_like(values)
+        grads[self.root] = 1.0
+        for kind, start, children in reversed(self.groups):
+            upstream = grads[start:start + len(children)][:, None, :]
+            if kind == ADD:
+                contribution = np.broadcast_to(upstream, children.shape + (values.shape[1],))
+            else:
+                # Product of the other children without dividing, so zero indicators are safe
+                gathered = values[children]
+                left = np.ones_like(gathered)
+                right = np.ones_like(gathered)
+                left[:, 1:] = np.cumprod(gathered[:, :-1], axis=1)
+                right[:, :-1] = np.cumprod(gathered[:, :0:-1], axis=1)[:, ::-1]
+                contribution = upstream * left * right
+            np.add.at(grads, children, contribution)
+        return grads
+
+    def evaluate(self, evidence=None):
+        """P(evidence) in one upward pass"""
+        return float(self.forward(self.indicators(evidence or {}))[self.root, 0])
+
+    def marginals_batch(self, evidence):
+        """
+        Posterior of every variable for every evidence row, from one forward and one backward pass
+
+        Args:
+            evidence (dict or pd.DataFrame): Equal-length columns of observed values
+
+        Returns:
+            dict: {variable: (rows, card) array}; an observed variable gets the posterior
+            it would have if its own observation were retracted
+        """
+        self.check_evidence(evidence)
+        columns = {name: np.asarray(evidence[name]) for name in evidence}
+        n_rows = len(next(iter(columns.values()))) if columns else 1
+        values = self.forward(self.indicators(columns, n_rows))
+        grads = self.backward(values)
+
+        marginals = {}
+        for variable in self.variables:
+            offset = self.indicator_offset[variable]
+            joint = grads[offset:offset + self.card[variable]].T
+            with np.errstate(invalid='ignore'):
+                marginals[variable] = joint / joint.sum(axis=1, keepdims=True)
+        return marginals
+
+    def marginals(self, evidence=None):
+        """{variable: {value: probability}} for every variable given one evidence dict"""
+        batch = self.marginals_batch({name: [value] for name, value in (evidence or {}).items()})
+        return {variable: dict(zip(self.values[variable], batch[variable][0])) for variable in self.variables}
+
+    def query(self, variable, evidence=None):
+        """Same answer as EnumerationEngine.query"""
+        evidence = evidence or {}
+        self.check_evidence(evidence)
+        if variable in evidence:
+            return {value: float(str(value) == str(evidence[variable])) for value in self.values[variable]}
+        return self.marginals(evidence)[variable]
+
+    def save(self, path):
+        """Write the compiled circuit and its network description to an .npz file"""
+        network = json.dumps({'variables': self.variables, 'parents': self.parents,
+                              'values': self.values,
+                              'shapes': {variable: table.shape for variable, table in self.tables.items()}},
+                             default=str)
+        groups = np.array([(kind, start, children.shape[0], children.shape[1])
+                           for kind, start, children in self.groups], dtype=np.int64)
+        with open(path, 'wb') as f:
+            np.savez(f, network=np.array(network), fingerprint=np.array(self.fingerprint),
+                     params=self.params, root=np.array(self.root), groups=groups,
+                     children=np.concatenate([children.ravel() for _, _, children in self.groups]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            network = json.loads(str(data['network']))
+            circuit = cls.__new__(cls)
+            circuit.variables = network['variables']
+            circuit.parents = network['parents']
+            circuit.values = network['values']
+            circuit.card = {variable: len(values) for variable, values in circuit.values.items()}
+            circuit.value_index = {variable: {str(value): idx for idx, value in enumerate(values)}
+                                   for variable, values in circuit.values.items()}
+            circuit.params = data['params']
+            circuit.fingerprint = str(data['fingerprint'])
+
+            circuit.tables = {}
+            circuit.indicator_offset = {}
+            position, n_indicators = 0, 0
+            for variable in circuit.variables:
+                shape = tuple(network['shapes'][variable])
+                size = int(np.prod(shape))
+                circuit.tables[variable] = circuit.params[position:position + size].reshape(shape)
+                position += size
+                circuit.indicator_offset[variable] = n_indicators
+                n_indicators += circuit.card[variable]
+            circuit.n_indicators = n_indicators
+
+            circuit.groups = []
+            flat = data['children']
+            offset = 0
+            for kind, start, count, arity in data['groups'].tolist():
+                circuit.groups.append((kind, start, flat[offset:offset + count * arity].reshape(count, arity)))
+                offset += count * arity
+            circuit.root = int(data['root'])
+            circuit.n_nodes = circuit.groups[-1][1] + len(circuit.groups[-1][2])
+        return circuit
+
+    @classmethod
+    def compile_cached(cls, variables, values, parents, tables, path):
+        """Load the circuit at path if it was compiled from this exact network, otherwise compile and save it"""
+        if os.path.exists(path):
+            circuit = cls.load(path)
+            if circuit.fingerprint == network_fingerprint(variables, values, parents, tables):
+                return circuit
+        circuit = cls(variables, values, parents, tables)
+        circuit.save(path)
+        return circuit
+
+
+def _align(factor, scope, shape):
+    """Broadcast a factor's id array to the axes of scope"""
+    factor_scope, ids = factor
+    order = sorted(range(len(factor_scope)), key=lambda axis: scope.index(factor_scope[axis]))
+    ids = np.transpose(ids, order)
+    expanded = [shape[axis] if name in factor_scope else 1 for axis, name in enumerate(scope)]
+    return np.broadcast_to(ids.reshape(expanded), shape)
+
+
+def network_fingerprint(variables, values, parents, tables):
+    digest = hashlib.sha1()
+    digest.update(json.dumps([[variable, [str(value) for value in values[variable]], list(parents[variable])]
+                              for variable in variables]).encode('utf-8'))
+    for variable in variables:
+        digest.update(np.ascontiguousarray(tables[variable], dtype=np.float64).tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+
+def cpd_tensor(cpd):
+    """CPT of a pgmpy TabularCPD as a tensor with axes evidence..., variable"""
+    # pgmpy stores (variable, evidence...); move the variable axis last
+    return np.moveaxis(cpd.get_values().reshape(cpd.cardinality), 0, -1)
+
+
+def network_from_pgmpy(model):
+    """
+    Variables, state names, parents and CPT tensors of a pgmpy BayesianNetwork
+
+    Returns:
+        tuple: (variables, {variable: [states]}, {variable: [parents]},
+        {variable: tensor with axes parents..., variable})
+    """
+    variables = list(model.nodes())
+    values, parents, tables = {}, {}, {}
+    for variable in variables:
+        cpd = model.get_cpds(variable)
+        parents[variable] = list(cpd.variables[1:])
+        values[variable] = list(cpd.state_names.get(variable, range(cpd.cardinality[0])))
+        tables[variable] = cpd_tensor(cpd)
+    return variables, values, parents, tables
+
+
+def encode_column(variable, column, encode):
+    """Vectorized encode(variable, value) of a whole column, calling encode once per distinct value"""
+    inverse, unique = pd.factorize(np.asarray(column))
+    if (inverse < 0).any():
+        raise ValueError(f"Missing value in evidence column {variable}")
+    return np.array([encode(variable, value) for value in unique], dtype=np.intp)[inverse]
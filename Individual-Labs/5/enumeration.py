@@ -0,0 +1,200 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from encoding import encode_column
+
+CPT_KEY = re.compile(r'^P\((\w+)=([^|)]+)(?:\|([^)]*))?\)$')
+
+
+def parse_cpt(cpt):
+    """
+    Parse the flat 'P(X=x|Y=y,Z=z)' dict format of Ex1.py / Ex2.py
+
+    Values of each variable are taken in order of first appearance. A boolean
+    variable given only as 'X=True' gets its 'False' state added, and any single
+    missing entry of a distribution is filled in as the complement of the others.
+
+    Returns:
+        tuple: (variables in topological order, {variable: [values]},
+        {variable: [parents]}, {variable: tensor with axes parents..., variable})
+    """
+    entries = []
+    values = {}
+    parents = {}
+    for key, probability in cpt.items():
+        match = CPT_KEY.match(key.replace(' ', ''))
+        if not match:
+            raise ValueError(f"Cannot parse CPT entry {key!r}")
+        variable, value, condition = match.groups()
+        assignment = [tuple(part.split('=', 1)) for part in condition.split(',')] if condition else []
+
+        for name, name_value in [(variable, value)] + assignment:
+            values.setdefault(name, [])
+            if name_value not in values[name]:
+                values[name].append(name_value)
+        parents.setdefault(variable, [name for name, _ in assignment])
+        entries.append((variable, value, dict(assignment), probability))
+
+    for variable, variable_values in values.items():
+        parents.setdefault(variable, [])
+        if variable_values == ['True']:
+            variable_values.append('False')
+
+    tables = {}
+    for variable in values:
+        shape = [len(values[parent]) for parent in parents[variable]] + [len(values[variable])]
+        tables[variable] = np.full(shape, np.nan)
+    for variable, value, assignment, probability in entries:
+        index = tuple(values[parent].index(assignment[parent]) for parent in parents[variable])
+        tables[variable][index + (values[variable].index(value),)] = probability
+
+    for variable, table in tables.items():
+        missing = np.isnan(table)
+        if (missing.sum(axis=-1) > 1).any():
+            raise ValueError(f"CPT for {variable} leaves more than one value of a distribution unspecified")
+        complement = 1 - np.nansum(table, axis=-1, keepdims=True)
+        tables[variable] = np.where(missing, complement, table)
+
+    return _topological_order(parents), values, parents, tables
+
+
+def _topological_order(parents):
+    order = []
+    placed = set()
+    while len(order) < len(parents):
+        ready = [variable for variable in parents
+                 if variable not in placed and all(parent in placed for parent in parents[variable])]
+        if not ready:
+            raise ValueError("CPT parents form a cycle")
+        order.extend(ready)
+        placed.update(ready)
+    return order
+
+
+class EnumerationEngine:
+    """
+    Exact inference by enumeration over NumPy CPT tensors
+
+    The CPT dict is parsed once. A query P(variable | evidence) slices every tensor
+    at the evidence values and sums the product of all factors over the hidden
+    variables in a single einsum, so no probability keys are formatted or looked up
+    per query.
+    """
+
+    def __init__(self, cpt):
+        self.variables, self.values, self.parents, self.tables = parse_cpt(cpt)
+        self.axis = {variable: idx for idx, variable in enumerate(self.variables)}
+        self.value_index = {variable: {value: idx for idx, value in enumerate(self.values[variable])}
+                            for variable in self.variables}
+        self._conditional_tables = {}
+
+    def encode(self, variable, value):
+        """Index of a value; bools and other scalars are matched by their string form ('True', 'e^1')"""
+        try:
+            return self.value_index[variable][str(value)]
+        except KeyError:
+            raise ValueError(f"Unknown value {value!r} for variable {variable}") from None
+
+    def check_evidence(self, evidence):
+        unknown = [name for name in evidence if name not in self.axis]
+        if unknown:
+            raise ValueError(f"Unknown evidence variables {unknown}")
+
+    def factors(self, evidence):
+        """einsum operands: each CPT tensor sliced at the evidence, followed by its remaining axis ids"""
+        operands = []
+        for variable in self.variables:
+            scope = self.parents[variable] + [variable]
+            table = self.tables[variable]
+            index = tuple(self.encode(name, evidence[name]) if name in evidence else slice(None) for name in scope)
+            operands.append(table[index])
+            operands.append([self.axis[name] for name in scope if name not in evidence])
+        return operands
+
+    def query(self, variable, evidence=None):
+        """
+        P(variable | evidence) by enumeration
+
+        Args:
+            variable (str): Query variable
+            evidence (dict): {variable: value} observations
+
+        Returns:
+            dict: {value: probability}
+        """
+        evidence = evidence or {}
+        self.check_evidence(evidence)
+        if variable in evidence:
+            return {value: float(value == str(evidence[variable])) for value in self.values[variable]}
+
+        unnormalized = np.einsum(*self.factors(evidence), [self.axis[variable]], optimize=True)
+        return dict(zip(self.values[variable], unnormalized / unnormalized.sum()))
+
+    def probability(self, variable, value, evidence=None):
+        """P(variable=value | evidence)"""
+        return self.query(variable, evidence)[str(value)]
+
+    def encode_column(self, variable, column):
+        """Vectorized encode() of a whole column of values"""
+        return encode_column(variable, column, self.encode)
+
+    def conditional_table(self, variable, evidence_variables):
+        """
+        P(variable | evidence_variables) for every evidence assignment at once
+
+        Computed with one einsum over the unsliced CPTs and cached per evidence shape.
+
+        Returns:
+            np.ndarray: Axes evidence_variables..., variable; rows of impossible
+            evidence are NaN
+        """
+        key = (variable, tuple(evidence_variables))
+        if key not in self._conditional_tables:
+            operands = []
+            for name in self.variables:
+                operands.append(self.tables[name])
+                operands.append([self.axis[scope] for scope in self.parents[name] + [name]])
+            output = [self.axis[name] for name in evidence_variables] + [self.axis[variable]]
+            joint = np.einsum(*operands, output, optimize=True)
+            with np.errstate(invalid='ignore'):
+                self._conditional_tables[key] = joint / joint.sum(axis=-1, keepdims=True)
+        return self._conditional_tables[key]
+
+    def query_batch(self, variable, evidence):
+        """
+        Posterior of variable for every evidence row in one vectorized lookup
+
+        Args:
+            variable (str): Query variable
+            evidence (dict or pd.DataFrame): Equal-length columns of observed values,
+                one column per evidence variable
+
+        Returns:
+            np.ndarray: (rows, number of values of variable), columns in self.values[variable] order
+        """
+        self.check_evidence(evidence)
+        if variable in evidence:
+            # As in query(), an observed query variable is certain whatever else is observed
+            return np.eye(len(self.values[variable]))[self.encode_column(variable, evidence[variable])]
+
+        evidence_variables = list(evidence)
+        table = self.conditional_table(variable, evidence_variables)
+        if not evidence_variables:
+            rows = len(evidence) if isinstance(evidence, pd.DataFrame) else 1
+            return np.tile(table, (rows, 1))
+        codes = tuple(self.encode_column(name, evidence[name]) for name in evidence_variables)
+        return table[codes]
+
+    def query_csv(self, path, variable, chunksize=1_000_000):
+        """
+        Stream query_batch over an evidence CSV larger than memory
+
+        Every column named after a network variable is used as evidence.
+
+        Yields:
+            np.ndarray: Posteriors for each chunk of rows, in file order
+        """
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str):
+            yield self.query_batch(variable, chunk[[name for name in chunk.columns if name in self.axis]])
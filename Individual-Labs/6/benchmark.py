@@ -0,0 +1,101 @@
+import time
+
+import numpy as np
+from pgmpy.models import BayesianNetwork
+from pgmpy.factors.discrete import TabularCPD
+
+from planner import QueryPlanner
+from structured_cpd import NoisyMaxCPD, RuleCPD
+
+
+def fan_in_network(n_parents, card):
+    """n_parents independent roots X0..Xn-1 with uniform priors, all pointing at Y"""
+    parents = [f"X{i}" for i in range(n_parents)]
+    model = BayesianNetwork([(parent, 'Y') for parent in parents])
+    model.add_cpds(*[TabularCPD(parent, card, [[1 / card]] * card) for parent in parents])
+    return model, parents
+
+
+def noisy_or_cpd(parents, seed=0):
+    rng = np.random.default_rng(seed)
+    return NoisyMaxCPD.noisy_or('Y', parents, rng.uniform(0.2, 0.9, len(parents)), leak=0.01)
+
+
+def rule_cpd(parents, card=3):
+    # Default row plus an all-high and an all-low corner, like Lab 10's Performance CPD
+    return RuleCPD('Y', card, parents, [card] * len(parents), default=[0.3, 0.5, 0.2],
+                   rules=[({parent: card - 1 for parent in parents}, [0.0, 0.1, 0.9]),
+                          ({parent: 0 for parent in parents}, [0.9, 0.1, 0.0])])
+
+
+def time_queries(planner, queries, repeat=20):
+    """Mean seconds per query and the planned multiply-adds of all queries"""
+    flops = sum(planner.plan(variables, evidence).estimated_flops for variables, evidence in queries)
+    for variables, evidence in queries:
+        planner.query(variables, evidence)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for variables, evidence in queries:
+            planner.query(variables, evidence)
+    return (time.perf_counter() - start) / (repeat * len(queries)), flops
+
+
+def check_evidence_handling():
+    """Unknown names raise, observed query variables come back one-hot, one output row per input row"""
+    model, parents = fan_in_network(3, 2)
+    planner = QueryPlanner(model, cpds=[noisy_or_cpd(parents)])
+    for evidence in ({'Typo': 1}, {'rank(Y)': 0}):
+        try:
+            planner.query(['Y'], evidence)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{evidence} should raise ValueError")
+
+    assert np.array_equal(planner.query_batch(['Y'], {'Y': [0, 1, 1]}), np.eye(2)[[0, 1, 1]])
+    assert np.array_equal(planner.query(['Y'], {'Y': 1}).values, [0, 1])
+    evidence = {'X0': [0, 1], 'X1': [1, 1]}
+    joint = planner.query_batch(['Y', 'X0'], evidence)
+    for row, (x0, x1) in enumerate(zip(*evidence.values())):
+        expected = np.outer(planner.query(['Y'], {'X0': x0, 'X1': x1}).values, np.eye(2)[x0])
+        assert np.allclose(joint[row], expected)
+
+
+def benchmark_structured_cpds(kind='noisy_or', parent_counts=(2, 4, 6, 8, 10, 12, 14, 16, 20, 40),
+                              max_tabular_entries=2 ** 22):
+    """
+    Memory and query time of one structured CPD against its expanded TabularCPD
+
+    Queries are the diagnostic P(X0 | Y) and the predictive P(Y | first half of the
+    parents); the tabular side is skipped once its table would exceed max_tabular_entries.
+    """
+    card = 2 if kind == 'noisy_or' else 3
+    print(f"{kind} CPD, {card}-state parents")
+    print(f"{'parents':>7} {'table KiB':>10} {'compact KiB':>12} {'table flops':>12} {'compact flops':>14} "
+          f"{'table ms':>9} {'compact ms':>11}")
+    for n_parents in parent_counts:
+        model, parents = fan_in_network(n_parents, card)
+        cpd = noisy_or_cpd(parents) if kind == 'noisy_or' else rule_cpd(parents, card)
+        queries = [([parents[0]], {'Y': 1}),
+                   (['Y'], {parent: 1 for parent in parents[:n_parents // 2]})]
+
+        compact_time, compact_flops = time_queries(QueryPlanner(model, cpds=[cpd]), queries)
+
+        entries = card ** (n_parents + 1)
+        if entries <= max_tabular_entries:
+            tabular_model = model.copy()
+            tabular_model.add_cpds(*[model.get_cpds(parent) for parent in parents], cpd.to_tabular())
+            table_time, table_flops = time_queries(QueryPlanner(tabular_model), queries)
+            table_kib, table_flops, table_ms = f"{entries * 8 / 1024:.1f}", f"{table_flops:,}", f"{table_time * 1000:.3f}"
+        else:
+            table_kib = table_flops = table_ms = '-'
+
+        print(f"{n_parents:>7} {table_kib:>10} {cpd.nbytes / 1024:12.2f} {table_flops:>12} {compact_flops:14,} "
+              f"{table_ms:>9} {compact_time * 1000:11.3f}")
+
+
+if __name__ == "__main__":
+    check_evidence_handling()
+    benchmark_structured_cpds('noisy_or')
+    print()
+    benchmark_structured_cpds('rules', parent_counts=(2, 4, 6, 8, 10, 12, 20, 40))
@@ -0,0 +1,242 @@
+import numpy as np
+
+from lab5 import network_from_pgmpy
+
+
+class JunctionTree:
+    """
+    Junction tree (clique tree) of a discrete Bayesian network with NumPy message passing
+
+    The tree is built once: moralize the DAG, triangulate it with the min-fill
+    heuristic, keep the maximal elimination cliques and join them with a maximum
+    spanning tree over separator sizes. Every CPD is multiplied into one clique
+    that contains its family. Each calibration then sends one collect and one
+    distribute message per tree edge (Shafer-Shenoy), after which the posterior of
+    every variable can be read off its smallest clique.
+    """
+
+    def __init__(self, model):
+        self.variables, values, self.parents, self.tables = network_from_pgmpy(model)
+        self.card = {variable: len(values[variable]) for variable in self.variables}
+        self.axis = {variable: idx for idx, variable in enumerate(self.variables)}
+
+        self.cliques = self._triangulate()
+        self.neighbors = self._spanning_tree()
+        self.separators = {(i, j): tuple(v for v in self.cliques[i] if v in self.cliques[j])
+                           for i in range(len(self.cliques)) for j in self.neighbors[i]}
+        self.potentials = self._initial_potentials()
+
+        # Evidence for a variable enters through the smallest clique that contains it
+        self.home = {variable: min((i for i, clique in enumerate(self.cliques) if variable in clique),
+                                   key=lambda i: self.clique_size(i))
+                     for variable in self.variables}
+        self.order, self.tree_parent = self._rooted_order(root=0)
+
+    def clique_size(self, i):
+        return int(np.prod([self.card[variable] for variable in self.cliques[i]]))
+
+    def _triangulate(self):
+        adjacency = {variable: set() for variable in self.variables}
+        for child, parents in self.parents.items():
+            family = parents + [child]
+            for a in family:
+                for b in family:
+                    if a != b:
+                        adjacency[a].add(b)
+
+        cliques = []
+        remaining = set(self.variables)
+        while remaining:
+            def fill_in(variable):
+                neighbors = list(adjacency[variable] & remaining)
+                return sum(1 for i, a in enumerate(neighbors) for b in neighbors[i + 1:] if b not in adjacency[a])
+
+            variable = min(sorted(remaining, key=self.axis.get), key=fill_in)
+            neighbors = adjacency[variable] & remaining
+            for a in neighbors:
+                adjacency[a] |= neighbors - {a}
+            clique = frozenset(neighbors | {variable})
+            if not any(clique <= other for other in cliques):
+                cliques = [other for other in cliques if not other <= clique] + [clique]
+            remaining.remove(variable)
+
+        return [tuple(sorted(clique, key=self.axis.get)) for clique in cliques]
+
+    def _spanning_tree(self):
+        """Kruskal's maximum spanning tree with separator size as the edge weight"""
+        candidates = sorted(((len(set(a) & set(b)), i, j)
+                             for i, a in enumerate(self.cliques)
+                             for j, b in enumerate(self.cliques) if i < j), reverse=True)
+        component = list(range(len(self.cliques)))
+
+        def find(i):
+            while component[i] != i:
+                component[i] = component[component[i]]
+                i = component[i]
+            return i
+
+        neighbors = [[] for _ in self.cliques]
+        for _, i, j in candidates:
+            if find(i) != find(j):
+                component[find(i)] = find(j)
+                neighbors[i].append(j)
+                neighbors[j].append(i)
+        return neighbors
+
+    def _initial_potentials(self):
+        operands = [[] for _ in self.cliques]
+        for variable in self.variables:
+            family = set(self.parents[variable]) | {variable}
+            i = min((i for i, clique in enumerate(self.cliques) if family <= set(clique)),
+                    key=lambda i: self.clique_size(i))
+            operands[i] += [self.tables[variable], [self.axis[v] for v in self.parents[variable] + [variable]]]
+
+        potentials = []
+        for clique, clique_operands in zip(self.cliques, operands):
+            shape = tuple(self.card[variable] for variable in clique)
+            axes = [self.axis[variable] for variable in clique]
+            potentials.append(np.einsum(np.ones(shape), axes, *clique_operands, axes))
+        return potentials
+
+    def _rooted_order(self, root):
+        """Cliques in breadth-first order from root, with each clique's parent in the tree"""
+        order, tree_parent = [root], {root: None}
+        for i in order:
+            for j in self.neighbors[i]:
+                if j not in tree_parent:
+                    tree_parent[j] = i
+                    order.append(j)
+        return order, tree_parent
+
+    def _axes(self, variables):
+        return [self.axis[variable] for variable in variables]
+
+    def evidence_potentials(self, evidence):
+        """Clique potentials with every observed variable clamped by a 0/1 indicator"""
+        potentials = list(self.potentials)
+        for variable, value in evidence.items():
+            i = self.home[variable]
+            indicator = np.zeros(self.card[variable])
+            indicator[int(value)] = 1.0
+            potentials[i] = np.einsum(potentials[i], self._axes(self.cliques[i]),
+                                      indicator, [self.axis[variable]], self._axes(self.cliques[i]))
+        return potentials
+
+    def message(self, potentials, messages, i, j):
+        """Shafer-Shenoy message from clique i to neighbour j, normalized to sum to one"""
+        operands = [potentials[i], self._axes(self.cliques[i])]
+        for k in self.neighbors[i]:
+            if k != j:
+                operands += [messages[(k, i)], self._axes(self.separators[(k, i)])]
+        message = np.einsum(*operands, self._axes(self.separators[(i, j)]), optimize=True)
+        total = message.sum()
+        return message / total if total > 0 else message
+
+    def calibrate(self, evidence=None):
+        """
+        Collect then distribute messages over the whole tree
+
+        Returns:
+            tuple: (evidence potentials, {(i, j): message from i to j})
+        """
+        potentials = self.evidence_potentials(evidence or {})
+        messages = {}
+        for i in reversed(self.order[1:]):
+            messages[(i, self.tree_parent[i])] = self.message(potentials, messages, i, self.tree_parent[i])
+        for i in self.order[1:]:
+            messages[(self.tree_parent[i], i)] = self.message(potentials, messages, self.tree_parent[i], i)
+        return potentials, messages
+
+    def marginal(self, potentials, messages, variable):
+        """Normalized posterior of one variable from the calibrated belief of its home clique"""
+        i = self.home[variable]
+        operands = [potentials[i], self._axes(self.cliques[i])]
+        for k in self.neighbors[i]:
+            operands += [messages[(k, i)], self._axes(self.separators[(k, i)])]
+        belief = np.einsum(*operands, [self.axis[variable]], optimize=True)
+        return belief / belief.sum()
+
+    def query(self, evidence=None, variables=None):
+        """
+        Posterior of every (or every requested) variable from a single calibration
+
+        Args:
+            evidence (dict): {variable: state index}
+            variables (list): Variables to return; None returns all of them
+
+        Returns:
+            dict: {variable: np.ndarray posterior}
+        """
+        potentials, messages = self.calibrate(evidence)
+        return {variable: self.marginal(potentials, messages, variable)
+                for variable in (variables or self.variables)}
+
+
+class InferenceSession:
+    """
+    Stateful evidence session over a JunctionTree
+
+    Messages are cached per directed tree edge. Changing the evidence on a variable
+    only changes the potential of its home clique i, and the only messages that
+    depend on that potential are the ones pointing away from i, so exactly those are
+    dropped. Posterior reads recompute missing messages lazily, reusing every cached
+    message on the rest of the tree.
+    """
+
+    def __init__(self, junction_tree):
+        self.tree = junction_tree
+        self.evidence = {}
+        self.potentials = list(junction_tree.potentials)
+        self.messages = {}
+        self.recomputed = 0
+
+    def _set_evidence(self, variable, value):
+        if value is None:
+            self.evidence.pop(variable, None)
+        else:
+            self.evidence[variable] = value
+
+        tree = self.tree
+        home = tree.home[variable]
+        homed = {name: state for name, state in self.evidence.items() if tree.home[name] == home}
+        self.potentials[home] = tree.evidence_potentials(homed)[home]
+
+        # Drop every message on a path leading away from the changed clique
+        frontier, seen = [home], {home}
+        while frontier:
+            i = frontier.pop()
+            for j in tree.neighbors[i]:
+                if j not in seen:
+                    self.messages.pop((i, j), None)
+                    seen.add(j)
+                    frontier.append(j)
+
+    def add_evidence(self, variable, value):
+        """Observe variable = value (state index), replacing any earlier observation"""
+        if self.evidence.get(variable) != value:
+            self._set_evidence(variable, value)
+        return self
+
+    def retract_evidence(self, variable):
+        if variable in self.evidence:
+            self._set_evidence(variable, None)
+        return self
+
+    def _message(self, i, j):
+        if (i, j) not in self.messages:
+            for k in self.tree.neighbors[i]:
+                if k != j:
+                    self._message(k, i)
+            self.messages[(i, j)] = self.tree.message(self.potentials, self.messages, i, j)
+            self.recomputed += 1
+        return self.messages[(i, j)]
+
+    def posterior(self, variable):
+        i = self.tree.home[variable]
+        for k in self.tree.neighbors[i]:
+            self._message(k, i)
+        return self.tree.marginal(self.potentials, self.messages, variable)
+
+    def posteriors(self, variables=None):
+        """{variable: posterior} under the current evidence"""
+        return {variable: self.posterior(variable) for variable in (variables or self.tree.variables)}
@@ -0,0 +1,10 @@
+"""Lab 5's pgmpy reader and evidence column encoder, reused by the Lab 6 modules"""
+import os
+import sys
+
+# Resolved once here, so importing planner or junction_tree from anywhere just works
+LAB5 = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '5'))
+if LAB5 not in sys.path:
+    sys.path.append(LAB5)
+
+from encoding import cpd_tensor, encode_column, network_from_pgmpy  # noqa: E402
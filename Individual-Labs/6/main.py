@@ -1,7 +1,22 @@
+import time
+
 import numpy as np
 from pgmpy.models import BayesianNetwork
 from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
+from junction_tree import InferenceSession, JunctionTree
+from planner import QueryPlanner
+from structured_cpd import RuleCPD
+
+def structured_cpds():
+    # Uniform CPDs stored as a single default row instead of a full table
+    return [
+        RuleCPD('R', 3, ['D', 'S', 'W'], [3, 3, 4], default=[0.33] * 3),
+        RuleCPD('I', 4, ['S', 'W'], [3, 4], default=[0.25] * 4),
+        RuleCPD('M', 3, ['I'], [4], default=[0.33] * 3),
+        RuleCPD('C', 3, ['I'], [4], default=[0.33] * 3),
+        RuleCPD('E', 2, ['S', 'R'], [3, 3], default=[0.5] * 2),
+        RuleCPD('T', 3, ['I', 'M', 'C'], [4, 3, 3], default=[0.33] * 3),
+    ]
 
 def create_disaster_response_network():
     model = BayesianNetwork([
@@ -27,31 +42,7 @@ def create_disaster_response_network():
     cpd_w = TabularCPD(variable='W', variable_card=4,
         values=[[0.25], [0.25], [0.25], [0.25]])
 
-    cpd_r = TabularCPD(variable='R', variable_card=3,
-        values=np.ones((3, 36)) * 0.33,  # Fill with uniform probabilities
-        evidence=['D', 'S', 'W'], evidence_card=[3, 3, 4])
-
-    cpd_i = TabularCPD(variable='I', variable_card=4,
-        values=np.ones((4, 12)) * 0.25,
-        evidence=['S', 'W'], evidence_card=[3, 4])
-
-    cpd_m = TabularCPD(variable='M', variable_card=3,
-        values=np.ones((3, 4)) * 0.33,
-        evidence=['I'], evidence_card=[4])
-
-    cpd_c = TabularCPD(variable='C', variable_card=3,
-        values=np.ones((3, 4)) * 0.33,
-        evidence=['I'], evidence_card=[4])
-
-    cpd_e = TabularCPD(variable='E', variable_card=2,
-        values=np.ones((2, 9)) * 0.5,
-        evidence=['S', 'R'], evidence_card=[3, 3])
-
-    cpd_t = TabularCPD(variable='T', variable_card=3,
-        values=np.ones((3, 36)) * 0.33,
-        evidence=['I', 'M', 'C'], evidence_card=[4, 3, 3])
-
-    model.add_cpds(cpd_d, cpd_s, cpd_r, cpd_w, cpd_i, cpd_m, cpd_c, cpd_e, cpd_t)
+    model.add_cpds(cpd_d, cpd_s, cpd_w, *[cpd.to_tabular() for cpd in structured_cpds()])
 
     if not model.check_model():
         raise ValueError("Model is not valid")
@@ -60,19 +51,66 @@ def create_disaster_response_network():
 
 def disaster_response_inference():
     model = create_disaster_response_network()
-    inference = VariableElimination(model)
+    # Build the clique tree once; one calibration answers every variable
+    junction_tree = JunctionTree(model)
     evidence = {'D': 0, 'S': 2, 'W': 2}
 
     print("Inference Results:")
-    response_time = inference.query(variables=['T'], evidence=evidence)
+    posteriors = junction_tree.query(evidence)
+
     print("\nEmergency Response Time Probabilities:")
-    for idx, prob in enumerate(response_time.values):
+    for idx, prob in enumerate(posteriors['T']):
         print(f"State {idx}: {prob:.4f}")
 
-    evacuation_need = inference.query(variables=['E'], evidence=evidence)
     print("\nEvacuation Need Probabilities:")
-    for idx, prob in enumerate(evacuation_need.values):
+    for idx, prob in enumerate(posteriors['E']):
         print(f"State {idx}: {prob:.4f}")
 
+def incident_updates():
+    # Field reports arrive one at a time; only the affected messages are recomputed
+    session = InferenceSession(JunctionTree(create_disaster_response_network()))
+    reports = [('D', 0), ('S', 2), ('W', 2)]
+
+    print("\nIncremental Updates:")
+    for variable, state in reports:
+        start = time.perf_counter()
+        session.add_evidence(variable, state)
+        posteriors = session.posteriors(['T', 'E'])
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{variable}={state}: T={np.round(posteriors['T'], 4)}, E={np.round(posteriors['E'], 4)} "
+              f"({elapsed:.2f} ms)")
+
+def elimination_plans():
+    # Single-target queries still go through variable elimination; show what the planner picked
+    planner = QueryPlanner(create_disaster_response_network(), cpds=structured_cpds())
+    queries = [(['T'], {'D': 0, 'S': 2, 'W': 2}), (['E'], {'I': 1}), (['D'], {'T': 2, 'E': 1})]
+
+    print("\nElimination Plans:")
+    for variables, evidence in queries:
+        planner.query(variables, evidence)
+        plan, execution = planner.plan(variables, evidence), planner.executions[-1]
+        print(f"P({', '.join(variables)} | {', '.join(sorted(evidence))}): {plan.heuristic} {plan.order}, "
+              f"estimated {plan.estimated_flops} / measured {execution.flops_per_row:g} + "
+              f"{execution.shared_flops} shared flops, candidates {plan.estimates}")
+
+def scenario_batch(n_scenarios=50000):
+    # Monte Carlo disaster scenarios scored in one batched elimination
+    planner = QueryPlanner(create_disaster_response_network(), cpds=structured_cpds())
+    rng = np.random.default_rng(0)
+    scenarios = {'D': rng.integers(0, 3, n_scenarios),
+                 'S': rng.integers(0, 3, n_scenarios),
+                 'W': rng.integers(0, 4, n_scenarios)}
+
+    start = time.perf_counter()
+    posteriors = planner.query_batch(['T'], scenarios)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nScenario Batch ({n_scenarios} scenarios, {elapsed * 1000:.1f} ms):")
+    for idx, prob in enumerate(posteriors.mean(axis=0)):
+        print(f"Mean P(T = {idx}): {prob:.4f}")
+
 if __name__ == "__main__":
-    disaster_response_inference()
\ No newline at end of file
+    disaster_response_inference()
+    incident_updates()
+    elimination_plans()
+    scenario_batch()
\ No newline at end of file
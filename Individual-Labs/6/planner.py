@@ -0,0 +1,352 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pgmpy.factors.discrete import DiscreteFactor
+
+from lab5 import cpd_tensor, encode_column
+
+HEURISTICS = ('min_fill', 'min_weight', 'weighted_min_fill')
+
+# np.einsum accepts at most 32 operand arrays per call
+EINSUM_OPERANDS = 16
+# Execution records kept by a planner, oldest dropped first
+EXECUTION_HISTORY = 1000
+
+
+class EliminationPlan:
+    """Elimination order chosen for one query shape, with the cost estimate of every heuristic"""
+
+    def __init__(self, variables, evidence_variables, relevant, order, heuristic, estimates, largest_table):
+        self.variables = variables
+        self.evidence_variables = evidence_variables
+        self.relevant = relevant
+        self.order = order
+        self.heuristic = heuristic
+        self.estimates = estimates
+        self.estimated_flops = estimates[heuristic]
+        self.largest_table = largest_table
+        self.uses = 0
+
+    def __repr__(self):
+        return (f"EliminationPlan(variables={list(self.variables)}, "
+                f"evidence={sorted(self.evidence_variables)}, order={self.order}, "
+                f"heuristic={self.heuristic!r}, estimated_flops={self.estimated_flops}, uses={self.uses})")
+
+
+class ExecutionRecord:
+    """
+    Measured cost of one query_batch call, counted from the einsums actually run
+
+    Products that carry the batch axis are paid once per evidence row and reported per
+    row; products without it (factors untouched by evidence) are paid once per chunk
+    and reported as shared. For a single query, flops_per_row + shared_flops is what
+    the plan's estimate predicts.
+    """
+
+    def __init__(self, plan, rows, chunks, batched_flops, shared_flops, seconds):
+        self.plan = plan
+        self.rows = rows
+        self.chunks = chunks
+        self.flops_per_row = batched_flops / rows
+        self.shared_flops = shared_flops
+        self.seconds = seconds
+
+    def __repr__(self):
+        return (f"ExecutionRecord(variables={list(self.plan.variables)}, "
+                f"evidence={sorted(self.plan.evidence_variables)}, rows={self.rows}, chunks={self.chunks}, "
+                f"flops_per_row={self.flops_per_row:g}, shared_flops={self.shared_flops}, "
+                f"seconds={self.seconds:.6f})")
+
+
+class QueryPlanner:
+    """
+    Variable elimination with a planned, cached elimination order
+
+    For a query shape (query variables, set of evidence variables) the planner drops
+    barren nodes, builds the interaction graph of the remaining factors and runs each
+    greedy heuristic on it. The cost model prices each order in multiply-adds by
+    replaying it on the factor scopes; the cheapest order wins and is cached, so every
+    later query of the same shape only slices the CPTs and runs the elimination.
+
+    StructuredCPDs passed in cpds replace the model's CPDs of their variables. They
+    enter as their rank decomposition, with the term index as an extra hidden
+    variable 'rank(<variable>)', and are never expanded to a full table.
+    """
+
+    def __init__(self, model, heuristics=HEURISTICS, cpds=()):
+        structured = {cpd.variable: cpd for cpd in cpds}
+        self.variables = list(model.nodes())
+        self.card, self.parents, self.state_names, self.factors, self.rank = {}, {}, {}, {}, {}
+        for variable in self.variables:
+            if variable in structured:
+                cpd = structured[variable]
+                core, factors = cpd.decomposition()
+                self.rank[variable] = f"rank({variable})"
+                self.card[variable], self.card[self.rank[variable]] = cpd.variable_card, len(core)
+                self.parents[variable] = list(cpd.evidence)
+                self.state_names[variable] = list(range(cpd.variable_card))
+                self.factors[variable] = [(core, [self.rank[variable], variable])] + \
+                    [(factor, [self.rank[variable], parent]) for parent, factor in factors.items()]
+            else:
+                cpd = model.get_cpds(variable)
+                self.card[variable] = int(cpd.cardinality[0])
+                self.parents[variable] = list(cpd.variables[1:])
+                self.state_names[variable] = list(cpd.state_names[variable])
+                self.factors[variable] = [(cpd_tensor(cpd), self.parents[variable] + [variable])]
+
+        self.axis = {name: idx for idx, name in enumerate(self.variables + list(self.rank.values()))}
+        self.heuristics = heuristics
+        # einsum axis id of the evidence-row dimension
+        self.batch_axis = len(self.axis)
+        self.plans = {}
+        self.executions = deque(maxlen=EXECUTION_HISTORY)
+
+    def _relevant(self, variables, evidence_variables):
+        """Ancestors of the query and evidence; every other node is barren and sums to one"""
+        relevant = set()
+        frontier = list(variables) + list(evidence_variables)
+        while frontier:
+            variable = frontier.pop()
+            if variable not in relevant:
+                relevant.add(variable)
+                frontier.extend(self.parents[variable])
+        return relevant
+
+    def _scopes(self, relevant, evidence_variables):
+        """Scope of every factor of the relevant variables, with evidence variables sliced away"""
+        return [[name for name in scope if name not in evidence_variables]
+                for variable in relevant for _, scope in self.factors[variable]]
+
+    def _interaction_graph(self, scopes):
+        adjacency = {name: set() for scope in scopes for name in scope}
+        for scope in scopes:
+            for a in scope:
+                adjacency[a].update(name for name in scope if name != a)
+        return adjacency
+
+    def _score(self, heuristic, adjacency, variable):
+        neighbors = list(adjacency[variable])
+        if heuristic == 'min_weight':
+            return math.prod(self.card[name] for name in neighbors + [variable])
+
+        fill = [(a, b) for i, a in enumerate(neighbors) for b in neighbors[i + 1:] if b not in adjacency[a]]
+        if heuristic == 'min_fill':
+            return len(fill)
+        if heuristic == 'weighted_min_fill':
+            return sum(self.card[a] * self.card[b] for a, b in fill)
+        raise ValueError(f"Unknown elimination heuristic {heuristic!r}")
+
+    def _greedy_order(self, heuristic, adjacency, hidden):
+        adjacency = {variable: set(neighbors) for variable, neighbors in adjacency.items()}
+        remaining = set(hidden)
+        order = []
+        while remaining:
+            variable = min(sorted(remaining, key=self.axis.get),
+                           key=lambda name: self._score(heuristic, adjacency, name))
+            neighbors = adjacency.pop(variable)
+            for a in neighbors:
+                adjacency[a] |= neighbors - {a}
+                adjacency[a].discard(variable)
+            remaining.remove(variable)
+            order.append(variable)
+        return order
+
+    def _cost(self, order, scopes, variables):
+        """
+        Cost model: replay the elimination on factor scopes only
+
+        Every product table costs its size once per operand multiplied into it, the
+        same rule query_batch() applies to the einsums it actually runs.
+
+        Returns:
+            tuple: (multiply-adds per evidence row, entries of the largest product table)
+        """
+        scopes = [set(scope) for scope in scopes]
+        flops, largest = 0, 1
+        for variable in order:
+            bucket = [scope for scope in scopes if variable in scope]
+            scopes = [scope for scope in scopes if variable not in scope]
+            joined = set().union(*bucket)
+            size = math.prod(self.card[name] for name in joined)
+            flops += size * len(bucket)
+            largest = max(largest, size)
+            scopes.append(joined - {variable})
+        size = math.prod(self.card[name] for name in variables)
+        return flops + size * len(scopes), max(largest, size)
+
+    def plan(self, variables, evidence_variables):
+        """
+        Cached elimination plan for P(variables | evidence on evidence_variables)
+
+        Returns:
+            EliminationPlan
+        """
+        key = (tuple(variables), frozenset(evidence_variables))
+        if key not in self.plans:
+            relevant = self._relevant(variables, key[1])
+            scopes = self._scopes(relevant, key[1])
+            adjacency = self._interaction_graph(scopes)
+            hidden = (relevant | {self.rank[name] for name in relevant if name in self.rank}) - set(variables) - key[1]
+
+            orders = {heuristic: self._greedy_order(heuristic, adjacency, hidden) for heuristic in self.heuristics}
+            costs = {heuristic: self._cost(order, scopes, variables) for heuristic, order in orders.items()}
+            # Ties go to the first heuristic listed
+            heuristic = min(self.heuristics, key=lambda name: costs[name][0])
+            self.plans[key] = EliminationPlan(key[0], key[1], relevant, orders[heuristic], heuristic,
+                                              {name: flops for name, (flops, _) in costs.items()},
+                                              costs[heuristic][1])
+        return self.plans[key]
+
+    def encode(self, variable, value):
+        try:
+            return self.state_names[variable].index(value)
+        except ValueError:
+            raise ValueError(f"Unknown state {value!r} for variable {variable}") from None
+
+    def encode_column(self, variable, column):
+        """Vectorized encode() of a whole column of state names"""
+        return encode_column(variable, column, self.encode)
+
+    def check_names(self, variables, evidence):
+        """Raise ValueError for query or evidence names that are not network variables"""
+        unknown = [name for name in list(variables) + list(evidence) if name not in self.state_names]
+        if unknown:
+            raise ValueError(f"Unknown variables {unknown}")
+
+    def _axes(self, scope):
+        return [self.batch_axis if name is None else self.axis[name] for name in scope]
+
+    def _einsum(self, factors, output, flops):
+        """
+        One einsum over factors, adding its measured cost to flops
+
+        The product table's size, read from the operands' actual shapes, is counted once
+        per operand under flops[True] if it carries the batch axis, else flops[False].
+        """
+        sizes = {}
+        for table, scope in factors:
+            sizes.update(zip(scope, table.shape))
+        flops[None in sizes] += math.prod(sizes.values()) * len(factors)
+        operands = [operand for table, scope in factors for operand in (table, self._axes(scope))]
+        return np.einsum(*operands, self._axes(output))
+
+    def _contract(self, factors, output, rows, flops):
+        """Product of factors summed onto output, in einsum calls of at most EINSUM_OPERANDS"""
+        while len(factors) > EINSUM_OPERANDS:
+            group, factors = factors[:EINSUM_OPERANDS], factors[EINSUM_OPERANDS:]
+            scope = list(dict.fromkeys(name for _, factor_scope in group for name in factor_scope))
+            factors.append((self._einsum(group, scope, flops), scope))
+
+        # Without evidence no factor has the batch axis; the result is the same for every row
+        present = [name for name in output if any(name in factor_scope for _, factor_scope in factors)]
+        table = self._einsum(factors, present, flops)
+        if len(present) < len(output):
+            table = np.broadcast_to(table, (rows,) + table.shape)
+        return table
+
+    def _eliminate(self, plan, codes, rows, flops):
+        """
+        Run the plan for a batch of evidence rows, adding the measured cost to flops
+
+        Every factor that mentions an evidence variable is gathered at the row codes, which
+        gives it a leading batch axis (scope entry None). The batch axis is never summed
+        out, so each einsum works on all rows at once.
+
+        Returns:
+            np.ndarray: Unnormalized (rows, cards of plan.variables...) joint
+        """
+        factors = []
+        for variable in self.variables:
+            if variable not in plan.relevant:
+                continue
+            for table, scope in self.factors[variable]:
+                observed = [axis for axis, name in enumerate(scope) if name in codes]
+                hidden = [axis for axis, name in enumerate(scope) if name not in codes]
+                table = table.transpose(observed + hidden)
+                if observed:
+                    table = table[tuple(codes[scope[axis]] for axis in observed)]
+                factors.append((table, ([None] if observed else []) + [scope[axis] for axis in hidden]))
+
+        for variable in plan.order:
+            bucket = [factor for factor in factors if variable in factor[1]]
+            factors = [factor for factor in factors if variable not in factor[1]]
+            output = list(dict.fromkeys(name for _, factor_scope in bucket for name in factor_scope if name != variable))
+            factors.append((self._contract(bucket, output, rows, flops), output))
+
+        return self._contract(factors, [None] + list(plan.variables), rows, flops)
+
+    def query_batch(self, variables, evidence, max_bytes=64 * 2 ** 20):
+        """
+        P(variables | evidence row) for N evidence rows in one call
+
+        Rows are processed in chunks sized so that the largest intermediate table of the
+        plan, times the rows in a chunk, stays under max_bytes. The measured cost of the
+        call is appended to self.executions as an ExecutionRecord.
+
+        Args:
+            variables (list): Query variables
+            evidence (dict or pd.DataFrame): Equal-length columns of state names, one
+                column per evidence variable
+            max_bytes (int): Memory budget for the intermediate tables of one chunk
+
+        Returns:
+            np.ndarray: (N, cards of variables...) posteriors; rows of impossible evidence are NaN.
+            Observed query variables are one-hot at their evidence value.
+        """
+        self.check_names(variables, evidence)
+        if isinstance(evidence, pd.DataFrame):
+            rows = len(evidence)
+        else:
+            rows = len(next(iter(evidence.values()))) if evidence else 1
+
+        observed = [name for name in variables if name in evidence]
+        if observed:
+            # The rest of the query is conditioned on every evidence column, observed ones included
+            hidden = [name for name in variables if name not in evidence]
+            rest = self.query_batch(hidden, evidence, max_bytes) if hidden else np.ones(rows)
+            factors = [(rest, [None] + hidden)] + \
+                [(np.eye(self.card[name])[self.encode_column(name, evidence[name])], [None, name]) for name in observed]
+            operands = [operand for table, scope in factors for operand in (table, self._axes(scope))]
+            return np.einsum(*operands, self._axes([None] + list(variables)))
+
+        evidence_variables = list(evidence)
+        plan = self.plan(variables, evidence_variables)
+        codes = {name: self.encode_column(name, evidence[name]) for name in evidence_variables}
+
+        chunk_size = max(1, max_bytes // (8 * plan.largest_table))
+        posteriors = np.empty((rows,) + tuple(self.card[name] for name in variables))
+        flops = {True: 0, False: 0}
+        start_time = time.perf_counter()
+        for start in range(0, rows, chunk_size):
+            chunk = {name: column[start:start + chunk_size] for name, column in codes.items()}
+            joint = self._eliminate(plan, chunk, min(chunk_size, rows - start), flops)
+            total = joint.reshape(len(joint), -1).sum(axis=1).reshape((-1,) + (1,) * len(variables))
+            with np.errstate(invalid='ignore'):
+                posteriors[start:start + chunk_size] = joint / total
+
+        plan.uses += rows
+        self.executions.append(ExecutionRecord(plan, rows, -(-rows // chunk_size), flops[True], flops[False],
+                                               time.perf_counter() - start_time))
+        return posteriors
+
+    def query(self, variables, evidence=None):
+        """
+        P(variables | evidence) by variable elimination along the cached plan
+
+        Args:
+            variables (list): Query variables
+            evidence (dict): {variable: state name} as in pgmpy; unknown variables raise ValueError
+
+        Returns:
+            DiscreteFactor: Normalized joint over variables, like VariableElimination.query
+        """
+        posterior = self.query_batch(variables, {name: [value] for name, value in (evidence or {}).items()})[0]
+        return DiscreteFactor(list(variables), [self.card[name] for name in variables], posterior,
+                              state_names={name: self.state_names[name] for name in variables})
+
+    def stats(self):
+        """Every cached plan: heuristic chosen, per-heuristic estimates and how many rows used it"""
+        return list(self.plans.values())
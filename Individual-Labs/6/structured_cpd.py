@@ -0,0 +1,183 @@
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+
+
+class StructuredCPD:
+    """
+    Compact CPD P(variable | evidence) that never stores the full table
+
+    Every subclass can write its table as a sum of R rank-one terms,
+
+        P(y | x_1..x_n) = sum_r core[r, y] * prod_i factor_i[r, x_i]
+
+    which decomposition() returns. The planner adds the term index r as a hidden
+    variable of cardinality R, so each parent only shares a small (R, card_i)
+    factor with it instead of all parents meeting in one exponential table.
+    """
+
+    def __init__(self, variable, variable_card, evidence=None, evidence_card=None):
+        self.variable = variable
+        self.variable_card = variable_card
+        self.evidence = list(evidence or [])
+        self.evidence_card = list(evidence_card or [])
+        if len(self.evidence) != len(self.evidence_card):
+            raise ValueError(f"{variable}: evidence and evidence_card must have the same length")
+        self.card = dict(zip(self.evidence, self.evidence_card))
+
+    def decomposition(self):
+        """
+        Returns:
+            tuple: (core (R, variable_card), {parent: (R, parent card) factor}); parents
+            whose factor is all ones are left out
+        """
+        raise NotImplementedError
+
+    @property
+    def nbytes(self):
+        core, factors = self.decomposition()
+        return core.nbytes + sum(factor.nbytes for factor in factors.values())
+
+    def to_tabular(self):
+        """Expand into a pgmpy TabularCPD, for check_model and printing only"""
+        core, factors = self.decomposition()
+        operands = [core, [0, len(self.evidence) + 1]]
+        for axis, parent in enumerate(self.evidence, start=1):
+            operands += [factors.get(parent, np.ones((len(core), self.card[parent]))), [0, axis]]
+        table = np.einsum(*operands, list(range(1, len(self.evidence) + 2)))
+        values = np.moveaxis(table, -1, 0).reshape(self.variable_card, -1)
+        return TabularCPD(self.variable, self.variable_card, values,
+                          evidence=self.evidence or None, evidence_card=self.evidence_card or None)
+
+    def _indicator(self, parent, states):
+        """0/1 row over the states of parent; states is one state or a collection of them"""
+        row = np.zeros(self.card[parent])
+        row[list(states) if isinstance(states, (list, tuple, set, frozenset)) else [states]] = 1.0
+        return row
+
+
+class RuleCPD(StructuredCPD):
+    """
+    Default distribution plus rules for specific parent contexts
+
+    Each rule is (context, distribution) with context {parent: state or states}; a
+    parent configuration matching a context takes that rule's distribution and every
+    other configuration takes the default. Contexts must not overlap, so each term
+    of the decomposition is the rule's difference from the default.
+
+    Example:
+        RuleCPD('Y', 3, ['A', 'B'], [3, 3], default=[0.3, 0.5, 0.2],
+                rules=[({'A': 2, 'B': 2}, [0.0, 0.1, 0.9])])
+    """
+
+    def __init__(self, variable, variable_card, evidence=None, evidence_card=None, default=None, rules=()):
+        super().__init__(variable, variable_card, evidence, evidence_card)
+        self.default = None if default is None else np.asarray(default, dtype=float)
+        self.rules = [(dict(context), np.asarray(distribution, dtype=float)) for context, distribution in rules]
+
+        for context, _ in self.rules:
+            unknown = set(context) - set(self.evidence)
+            if unknown:
+                raise ValueError(f"{variable}: rule context uses non-parents {sorted(unknown)}")
+        for i, (a, _) in enumerate(self.rules):
+            for b, _ in self.rules[i + 1:]:
+                if all(self._indicator(p, a[p]) @ self._indicator(p, b[p]) > 0 for p in set(a) & set(b)):
+                    raise ValueError(f"{variable}: rule contexts {a} and {b} overlap")
+
+    def decomposition(self):
+        cores, factors = [], {parent: [] for parent in self.evidence}
+        if self.default is not None:
+            cores.append(self.default)
+            for parent in self.evidence:
+                factors[parent].append(np.ones(self.card[parent]))
+
+        for context, distribution in self.rules:
+            cores.append(distribution if self.default is None else distribution - self.default)
+            for parent in self.evidence:
+                factors[parent].append(self._indicator(parent, context[parent]) if parent in context
+                                       else np.ones(self.card[parent]))
+
+        factors = {parent: np.array(rows) for parent, rows in factors.items()}
+        return np.array(cores), {parent: rows for parent, rows in factors.items() if not (rows == 1).all()}
+
+
+class TreeCPD(RuleCPD):
+    """
+    Context-specific CPD given as a decision tree over the parents
+
+    A tree is either a leaf distribution or (parent, {state or tuple of states: subtree}),
+    and every split must cover each state of its parent exactly once.
+
+    Example:
+        TreeCPD('E', 2, ['S', 'R'], [3, 3],
+                ('S', {(0, 1): [0.9, 0.1], 2: ('R', {0: [0.6, 0.4], (1, 2): [0.2, 0.8]})}))
+    """
+
+    def __init__(self, variable, variable_card, evidence, evidence_card, tree):
+        self.tree = tree
+        self.card = dict(zip(evidence, evidence_card))
+        super().__init__(variable, variable_card, evidence, evidence_card, rules=list(self._leaves(tree, {})))
+
+    def _leaves(self, tree, context):
+        if not (isinstance(tree, tuple) and len(tree) == 2 and isinstance(tree[1], dict)):
+            yield context, tree
+            return
+
+        parent, branches = tree
+        covered = sorted(state for states in branches
+                         for state in (states if isinstance(states, tuple) else (states,)))
+        if covered != list(range(self.card[parent])):
+            raise ValueError(f"{self.variable}: split on {parent} must cover each state once, got {covered}")
+        for states, subtree in branches.items():
+            yield from self._leaves(subtree, {**context, parent: states})
+
+
+class DeterministicCPD(RuleCPD):
+    """
+    variable = f(parents), given as {context: state} rules and a default state
+
+    Example:
+        DeterministicCPD('Alarm', 2, ['Smoke', 'Heat'], [2, 2], default=0,
+                         rules=[({'Smoke': 1}, 1), ({'Smoke': 0, 'Heat': 1}, 1)])
+    """
+
+    def __init__(self, variable, variable_card, evidence, evidence_card, default=None, rules=()):
+        one_hot = np.eye(variable_card)
+        super().__init__(variable, variable_card, evidence, evidence_card,
+                         default=None if default is None else one_hot[default],
+                         rules=[(context, one_hot[state]) for context, state in rules])
+
+
+class NoisyMaxCPD(StructuredCPD):
+    """
+    Noisy-MAX CPD over an ordinal variable (noisy-OR when everything is binary)
+
+    parameters[parent] is a (parent card, variable_card) table whose row s is the
+    distribution of the variable when only that parent is active in state s; row 0 is
+    the parent's inactive state and must be [1, 0, ...]. leak is the distribution with
+    every parent inactive. The cumulative P(Y <= y | x) is leak_cdf(y) times the
+    product of each parent's cdf, so the decomposition has variable_card terms:
+    P(Y = y) = F(y) - F(y - 1).
+    """
+
+    def __init__(self, variable, variable_card, evidence, evidence_card, parameters, leak=None):
+        super().__init__(variable, variable_card, evidence, evidence_card)
+        self.parameters = {parent: np.asarray(parameters[parent], dtype=float) for parent in self.evidence}
+        self.leak = np.eye(variable_card)[0] if leak is None else np.asarray(leak, dtype=float)
+        for parent, table in self.parameters.items():
+            if table.shape != (self.card[parent], variable_card):
+                raise ValueError(f"{variable}: parameters for {parent} must have shape "
+                                 f"{(self.card[parent], variable_card)}, got {table.shape}")
+            if not np.allclose(table[0], np.eye(variable_card)[0]):
+                raise ValueError(f"{variable}: inactive state of {parent} must not cause the effect")
+
+    @classmethod
+    def noisy_or(cls, variable, evidence, probabilities, leak=0.0):
+        """Binary noisy-OR: probabilities[parent] = P(variable | only that parent present)"""
+        parameters = {parent: [[1.0, 0.0], [1.0 - p, p]] for parent, p in zip(evidence, probabilities)}
+        return cls(variable, 2, evidence, [2] * len(evidence), parameters, leak=[1.0 - leak, leak])
+
+    def decomposition(self):
+        # core[z, y] = leak_cdf(z) * ([z == y] - [z == y - 1])
+        difference = np.eye(self.variable_card) - np.eye(self.variable_card, k=1)
+        core = np.cumsum(self.leak)[:, None] * difference
+        return core, {parent: np.cumsum(table, axis=1).T for parent, table in self.parameters.items()}
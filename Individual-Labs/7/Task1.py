@@ -1,5 +1,10 @@
 import numpy as np
 
+import circuit_model
+from accumulators import CoOccurrence, RunningMean, ValueCounts
+from gibbs import DiscreteNetwork, VectorizedGibbs
+from runner import run_parallel
+
 probabilities = {
     'VIN': {'220V': 0.8, '110V': 0.2},
     'TAMB': {'23C': 0.7, '30C': 0.3},
@@ -12,6 +17,8 @@ probabilities = {
     'OT': {'normal': 0.65, 'high': 0.35}
 }
 
+network = DiscreteNetwork.from_marginals(probabilities)
+
 initial_state = {
     'VIN': '220V',
     'TAMB': '23C',
@@ -40,19 +47,51 @@ def sample_given_blanket(state, node):
     probs = np.array(probs) / np.sum(probs)
     return np.random.choice(values, p=probs)
 
-def mcmc_sampling(state, target_node, iterations=1000):
-    samples = {target_node: []}
+def mcmc_sampling(state, target_node, iterations=1000, accumulators=()):
+    counts = ValueCounts(network, [target_node])
+    accumulators = [counts, *accumulators]
 
     for _ in range(iterations):
         for node in state:
             state[node] = sample_given_blanket(state, node)
-        samples[target_node].append(state[target_node])
+        for accumulator in accumulators:
+            accumulator.record(state)
+
+    return counts.snapshot()[target_node]
+
+if __name__ == "__main__":
+    posterior_iout = mcmc_sampling(initial_state, 'IOUT')
+    posterior_iout_readable = {str(k): float(v) for k, v in posterior_iout.items()}
+    print("Posterior distribution for IOUT:", posterior_iout_readable)
+
+    # Same sampler over 4096 integer-encoded chains at once
+    sampler = VectorizedGibbs(probabilities, chains=4096).initialize(initial_state)
+    posterior_vectorized = sampler.run('IOUT', iterations=1000)
+    print("Posterior distribution for IOUT (vectorized):",
+          {value: round(float(p), 4) for value, p in posterior_vectorized.items()})
 
-    unique, counts = np.unique(samples[target_node], return_counts=True)
-    posterior_distribution = dict(zip(unique, counts / iterations))
+    # Real Gibbs on the circuit DAG: each node is drawn given its Markov blanket
+    circuit = DiscreteNetwork(circuit_model.parents, circuit_model.cpts)
+    print("Markov blanket of IOUT:", circuit.markov_blanket('IOUT'))
+    sampler = VectorizedGibbs(circuit, chains=4096, evidence={'OT': 'high'})
+    posterior_overheating = sampler.run('IOUT', iterations=500, burn_in=50)
+    print("Posterior distribution for IOUT given OT=high:",
+          {value: round(float(p), 4) for value, p in posterior_overheating.items()})
 
-    return posterior_distribution
+    # Chains spread over every CPU, stopped once split-R-hat and ESS say they have mixed
+    result = run_parallel(circuit, 'IOUT', evidence={'OT': 'high'}, chains_per_process=1024, target_ess=20000)
+    print("Posterior distribution for IOUT given OT=high (parallel):",
+          {value: round(float(p), 4) for value, p in result['posterior'].items()},
+          f"ESS={result['ess']:.0f}, R-hat={result['rhat']:.3f} after {result['sweeps']} sweeps")
 
-posterior_iout = mcmc_sampling(initial_state, 'IOUT')
-posterior_iout_readable = {str(k): float(v) for k, v in posterior_iout.items()}
-print("Posterior distribution for IOUT:", posterior_iout_readable)
\ No newline at end of file
+    # Several targets, a running mean and a joint table on the same sweeps, read mid-run
+    counts = ValueCounts(circuit, ['IOUT', 'VOUT', 'STransformer'])
+    level = RunningMean(circuit, {'IOUT': {'low': 0, 'normal': 1, 'high': 2}})
+    joint = CoOccurrence(circuit, [('VOUT', 'IOUT')])
+    sampler = VectorizedGibbs(circuit, chains=4096, evidence={'OT': 'high'})
+    for sweep in sampler.sample([counts, level, joint], iterations=500, burn_in=50):
+        if sweep % 250 == 0:
+            mean, variance = level.snapshot()['IOUT']
+            print(f"After {sweep} sweeps: P(STransformer=Defective | OT=high) = "
+                  f"{counts.snapshot()['STransformer']['Defective']:.4f}, IOUT level {mean:.3f} +/- {variance ** 0.5:.3f}")
+    print("P(VOUT, IOUT | OT=high):\n", joint.snapshot()[('VOUT', 'IOUT')].round(4))
@@ -1,5 +1,10 @@
 import numpy as np
 
+import circuit_model
+from accumulators import ValueCounts
+from gibbs import DiscreteNetwork
+from metropolis import IncrementalMetropolis
+
 probabilities = {
     'VIN': {'220V': 0.8, '110V': 0.2},
     'TAMB': {'23C': 0.7, '30C': 0.3},
@@ -12,6 +17,8 @@ probabilities = {
     'OT': {'normal': 0.65, 'high': 0.35}
 }
 
+network = DiscreteNetwork.from_marginals(probabilities)
+
 initial_state = {
     'VIN': '220V',
     'TAMB': '23C',
@@ -30,8 +37,9 @@ def state_probability(state):
         prob *= probabilities[node].get(value, 0.0)
     return prob
 
-def metropolis_hastings_sampling(state, target_node, iterations=1000):
-    samples = {target_node: []}
+def metropolis_hastings_sampling(state, target_node, iterations=1000, accumulators=()):
+    counts = ValueCounts(network, [target_node])
+    accumulators = [counts, *accumulators]
 
     for _ in range(iterations):
         for node in state:
@@ -51,13 +59,27 @@ def metropolis_hastings_sampling(state, target_node, iterations=1000):
             else:
                 state[node] = current_value
 
-        samples[target_node].append(state[target_node])
+        for accumulator in accumulators:
+            accumulator.record(state)
+
+    return counts.snapshot()[target_node]
 
-    unique, counts = np.unique(samples[target_node], return_counts=True)
-    posterior_distribution = dict(zip(unique, counts / iterations))
+if __name__ == "__main__":
+    posterior_iout = metropolis_hastings_sampling(initial_state, 'IOUT')
+    posterior_iout_readable = {str(k): float(v) for k, v in posterior_iout.items()}
+    print("Posterior distribution for IOUT:", posterior_iout_readable)
 
-    return posterior_distribution
+    # Same proposals scored incrementally in log space, 4096 chains at once
+    sampler = IncrementalMetropolis(probabilities, chains=4096).initialize(initial_state)
+    posterior_incremental = sampler.run('IOUT', iterations=1000)
+    print("Posterior distribution for IOUT (incremental):",
+          {value: round(float(p), 4) for value, p in posterior_incremental.items()})
 
-posterior_iout = metropolis_hastings_sampling(initial_state, 'IOUT')
-posterior_iout_readable = {str(k): float(v) for k, v in posterior_iout.items()}
-print("Posterior distribution for IOUT:", posterior_iout_readable)
\ No newline at end of file
+    # On the circuit DAG, with the two supply components proposed as one block
+    circuit = DiscreteNetwork(circuit_model.parents, circuit_model.cpts)
+    blocks = [['STransformer', 'SRectifier']] + [[node] for node in circuit.nodes
+                                                 if node not in ('STransformer', 'SRectifier', 'VOUT')]
+    sampler = IncrementalMetropolis(circuit, chains=4096, evidence={'VOUT': 'low'}, blocks=blocks)
+    posterior_transformer = sampler.run('STransformer', iterations=1000, burn_in=100)
+    print("Posterior distribution for STransformer given VOUT=low:",
+          {value: round(float(p), 4) for value, p in posterior_transformer.items()})
\ No newline at end of file
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class Accumulator:
+    """
+    Running statistic of sampled states, updated in place after every sweep
+
+    update() takes the (chains, nodes) integer state of a MultiChainSampler, so memory
+    depends only on the nodes tracked, never on the number of sweeps. snapshot()
+    returns a copy of the current estimate and can be called at any point while
+    sampling continues.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.draws = 0
+
+    def _column(self, node):
+        if node not in self.network.index:
+            raise ValueError(f"Unknown node {node}")
+        return self.network.index[node]
+
+    def record(self, state):
+        """Update in place from one {node: value} state, as kept by the loops in Task1.py / Task2.py"""
+        self.update(np.array([[self.network.values[node].index(state[node]) for node in self.network.nodes]]))
+
+    def update(self, state):
+        raise NotImplementedError
+
+    def snapshot(self):
+        raise NotImplementedError
+
+
+class ValueCounts(Accumulator):
+    """Running counts of every value of each node in nodes; snapshot gives frequencies"""
+
+    def __init__(self, network, nodes):
+        super().__init__(network)
+        self.columns = {node: self._column(node) for node in nodes}
+        self.counts = {node: np.zeros(len(network.values[node]), dtype=np.int64) for node in nodes}
+
+    def update(self, state):
+        for node, column in self.columns.items():
+            self.counts[node] += np.bincount(state[:, column], minlength=len(self.counts[node]))
+        self.draws += len(state)
+
+    def snapshot(self):
+        """{node: {value: frequency}} over every draw so far"""
+        return {node: dict(zip(self.network.values[node], counts / max(self.draws, 1)))
+                for node, counts in self.counts.items()}
+
+
+class RunningMean(Accumulator):
+    """
+    Running mean and variance of numeric scores of node values
+
+    scores maps node -> {value: number}, e.g. {'IOUT': {'low': 0, 'normal': 1, 'high': 2}}.
+    Each sweep's chains are merged in as one batch with Chan's parallel update, which
+    stays accurate over very long runs where a plain sum of squares would not.
+    """
+
+    def __init__(self, network, scores):
+        super().__init__(network)
+        self.columns = {node: self._column(node) for node in scores}
+        self.scores = {node: np.array([scores[node].get(value, np.nan) for value in network.values[node]])
+                       for node in scores}
+        for node, table in self.scores.items():
+            if np.isnan(table).any():
+                raise ValueError(f"Scores for {node} must cover every value {network.values[node]}")
+        self.mean = {node: 0.0 for node in scores}
+        self.m2 = {node: 0.0 for node in scores}
+
+    def update(self, state):
+        batch = len(state)
+        total = self.draws + batch
+        for node, column in self.columns.items():
+            x = self.scores[node][state[:, column]]
+            batch_mean = x.mean()
+            delta = batch_mean - self.mean[node]
+            self.mean[node] += delta * batch / total
+            self.m2[node] += ((x - batch_mean) ** 2).sum() + delta ** 2 * self.draws * batch / total
+        self.draws = total
+
+    def snapshot(self):
+        """{node: (mean, variance)} over every draw so far"""
+        return {node: (self.mean[node], self.m2[node] / max(self.draws - 1, 1)) for node in self.mean}
+
+
+class CoOccurrence(Accumulator):
+    """Running joint counts of selected node pairs; snapshot gives (values_a, values_b) frequencies"""
+
+    def __init__(self, network, pairs):
+        super().__init__(network)
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.columns = {pair: (self._column(pair[0]), self._column(pair[1])) for pair in self.pairs}
+        self.counts = {pair: np.zeros((len(network.values[pair[0]]), len(network.values[pair[1]])), dtype=np.int64)
+                       for pair in self.pairs}
+
+    def update(self, state):
+        for pair, (first, second) in self.columns.items():
+            counts = self.counts[pair]
+            joint = state[:, first] * counts.shape[1] + state[:, second]
+            counts += np.bincount(joint, minlength=counts.size).reshape(counts.shape)
+        self.draws += len(state)
+
+    def snapshot(self):
+        """{(a, b): array of P(a, b)}, rows and columns in network.values order"""
+        return {pair: counts / max(self.draws, 1) for pair, counts in self.counts.items()}
@@ -0,0 +1,58 @@
+import time
+
+import circuit_model
+from gibbs import DiscreteNetwork, VectorizedGibbs
+from metropolis import IncrementalMetropolis
+import Task1
+import Task2
+
+
+def benchmark_gibbs(loop_iterations=2000, chains=4096, sweeps=500):
+    """Node samples per second of Task1's dict-based loop against the vectorized sampler"""
+    n_nodes = len(Task1.probabilities)
+
+    start = time.perf_counter()
+    Task1.mcmc_sampling(dict(Task1.initial_state), 'IOUT', iterations=loop_iterations)
+    loop_rate = loop_iterations * n_nodes / (time.perf_counter() - start)
+
+    sampler = VectorizedGibbs(Task1.probabilities, chains=chains, seed=0).initialize(Task1.initial_state)
+    start = time.perf_counter()
+    sampler.run('IOUT', iterations=sweeps)
+    vectorized_rate = sweeps * chains * n_nodes / (time.perf_counter() - start)
+
+    print(f"Gibbs, {n_nodes} nodes")
+    print(f"{'Task1 loop (1 chain):':<28}{loop_rate:14,.0f} samples/s")
+    print(f"{f'Vectorized ({chains} chains):':<28}{vectorized_rate:14,.0f} samples/s "
+          f"({vectorized_rate / loop_rate:.0f}x)")
+
+    circuit = DiscreteNetwork(circuit_model.parents, circuit_model.cpts)
+    sampler = VectorizedGibbs(circuit, chains=chains, seed=0, evidence={'OT': 'high'})
+    start = time.perf_counter()
+    sampler.run('IOUT', iterations=sweeps)
+    blanket_rate = sweeps * chains * len(sampler.free) / (time.perf_counter() - start)
+    print(f"{'Markov-blanket Gibbs:':<28}{blanket_rate:14,.0f} samples/s (circuit DAG, OT observed)")
+
+
+def benchmark_metropolis(loop_iterations=2000, chains=4096, sweeps=500):
+    """Proposals per second of Task2's full-product loop against incremental log-score MH"""
+    n_nodes = len(Task2.probabilities)
+
+    start = time.perf_counter()
+    Task2.metropolis_hastings_sampling(dict(Task2.initial_state), 'IOUT', iterations=loop_iterations)
+    loop_rate = loop_iterations * n_nodes / (time.perf_counter() - start)
+
+    sampler = IncrementalMetropolis(Task2.probabilities, chains=chains, seed=0).initialize(Task2.initial_state)
+    start = time.perf_counter()
+    sampler.run('IOUT', iterations=sweeps)
+    incremental_rate = sweeps * chains * n_nodes / (time.perf_counter() - start)
+
+    print(f"Metropolis-Hastings, {n_nodes} nodes")
+    print(f"{'Task2 loop (1 chain):':<28}{loop_rate:14,.0f} proposals/s")
+    print(f"{f'Incremental ({chains} chains):':<28}{incremental_rate:14,.0f} proposals/s "
+          f"({incremental_rate / loop_rate:.0f}x)")
+
+
+if __name__ == "__main__":
+    benchmark_gibbs()
+    print()
+    benchmark_metropolis()
@@ -0,0 +1,56 @@
+# Circuit-diagnosis network behind Task1.py / Task2.py, with the dependencies the
+# marginal tables there leave out. Root nodes keep their Task1 marginals; a child's
+# CPT maps each tuple of parent values (in `parents` order) to its distribution.
+
+parents = {
+    'VIN': [],
+    'TAMB': [],
+    'STransformer': ['TAMB'],
+    'SRectifier': [],
+    'VOUT': ['VIN', 'STransformer', 'SRectifier'],
+    'IOUT': ['VOUT', 'OPT', 'NL'],
+    'OPT': [],
+    'NL': [],
+    'OT': ['IOUT']
+}
+
+cpts = {
+    'VIN': {'220V': 0.8, '110V': 0.2},
+    'TAMB': {'23C': 0.7, '30C': 0.3},
+    'STransformer': {
+        ('23C',): {'Working': 0.93, 'Defective': 0.07},
+        ('30C',): {'Working': 0.83, 'Defective': 0.17}
+    },
+    'SRectifier': {'Working': 0.85, 'Defective': 0.15},
+    'VOUT': {
+        ('220V', 'Working', 'Working'): {'normal': 0.85, 'low': 0.08, 'high': 0.07},
+        ('220V', 'Working', 'Defective'): {'normal': 0.3, 'low': 0.5, 'high': 0.2},
+        ('220V', 'Defective', 'Working'): {'normal': 0.2, 'low': 0.5, 'high': 0.3},
+        ('220V', 'Defective', 'Defective'): {'normal': 0.1, 'low': 0.6, 'high': 0.3},
+        ('110V', 'Working', 'Working'): {'normal': 0.5, 'low': 0.45, 'high': 0.05},
+        ('110V', 'Working', 'Defective'): {'normal': 0.15, 'low': 0.8, 'high': 0.05},
+        ('110V', 'Defective', 'Working'): {'normal': 0.1, 'low': 0.8, 'high': 0.1},
+        ('110V', 'Defective', 'Defective'): {'normal': 0.05, 'low': 0.9, 'high': 0.05}
+    },
+    'IOUT': {
+        ('normal', 'on', 'low'): {'normal': 0.7, 'low': 0.1, 'high': 0.2},
+        ('normal', 'on', 'high'): {'normal': 0.5, 'low': 0.05, 'high': 0.45},
+        ('normal', 'off', 'low'): {'normal': 0.8, 'low': 0.15, 'high': 0.05},
+        ('normal', 'off', 'high'): {'normal': 0.65, 'low': 0.1, 'high': 0.25},
+        ('low', 'on', 'low'): {'normal': 0.3, 'low': 0.6, 'high': 0.1},
+        ('low', 'on', 'high'): {'normal': 0.35, 'low': 0.45, 'high': 0.2},
+        ('low', 'off', 'low'): {'normal': 0.2, 'low': 0.75, 'high': 0.05},
+        ('low', 'off', 'high'): {'normal': 0.3, 'low': 0.6, 'high': 0.1},
+        ('high', 'on', 'low'): {'normal': 0.3, 'low': 0.05, 'high': 0.65},
+        ('high', 'on', 'high'): {'normal': 0.15, 'low': 0.05, 'high': 0.8},
+        ('high', 'off', 'low'): {'normal': 0.45, 'low': 0.05, 'high': 0.5},
+        ('high', 'off', 'high'): {'normal': 0.3, 'low': 0.05, 'high': 0.65}
+    },
+    'OPT': {'on': 0.4, 'off': 0.6},
+    'NL': {'low': 0.7, 'high': 0.3},
+    'OT': {
+        ('normal',): {'normal': 0.85, 'high': 0.15},
+        ('low',): {'normal': 0.9, 'high': 0.1},
+        ('high',): {'normal': 0.3, 'high': 0.7}
+    }
+}
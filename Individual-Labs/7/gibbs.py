@@ -0,0 +1,221 @@
+import numpy as np
+
+from accumulators import ValueCounts
+
+
+def encode_marginals(probabilities):
+    """
+    Integer-encode the {node: {value: probability}} tables of Task1.py / Task2.py
+
+    Returns:
+        tuple: (nodes, {node: [values]}, {node: normalized probability array})
+    """
+    nodes = list(probabilities)
+    values = {node: list(probabilities[node]) for node in nodes}
+    tables = {}
+    for node in nodes:
+        table = np.array([probabilities[node][value] for value in values[node]], dtype=float)
+        tables[node] = table / table.sum()
+    return nodes, values, tables
+
+
+class DiscreteNetwork:
+    """
+    Integer-encoded DAG with CPT arrays (axes parents..., node), normalized per row
+
+    cpts follows circuit_model.py: a root maps value -> probability, a child maps each
+    tuple of parent values to a {value: probability} row.
+    """
+
+    def __init__(self, parents, cpts):
+        self.nodes = list(cpts)
+        self.parents = {node: list(parents.get(node, [])) for node in self.nodes}
+        self.index = {node: idx for idx, node in enumerate(self.nodes)}
+        self.children = {node: [child for child in self.nodes if node in self.parents[child]] for node in self.nodes}
+
+        self.values = {}
+        for node in self.nodes:
+            rows = [cpts[node]] if not self.parents[node] else cpts[node].values()
+            self.values[node] = list(dict.fromkeys(value for row in rows for value in row))
+
+        self.tables = {}
+        for node in self.nodes:
+            shape = [len(self.values[parent]) for parent in self.parents[node]] + [len(self.values[node])]
+            table = np.zeros(shape)
+            rows = {(): cpts[node]} if not self.parents[node] else cpts[node]
+            for condition, row in rows.items():
+                condition = condition if isinstance(condition, tuple) else (condition,)
+                index = tuple(self.values[parent].index(value) for parent, value in zip(self.parents[node], condition))
+                table[index] = [row.get(value, 0.0) for value in self.values[node]]
+            totals = table.sum(axis=-1, keepdims=True)
+            if (totals == 0).any():
+                raise ValueError(f"CPT for {node} is missing rows for some parent values")
+            self.tables[node] = table / totals
+
+    @classmethod
+    def from_marginals(cls, probabilities):
+        """Parentless network from Task1's {node: {value: probability}} tables"""
+        return cls({}, probabilities)
+
+    def topological_order(self):
+        order, placed = [], set()
+        while len(order) < len(self.nodes):
+            ready = [node for node in self.nodes
+                     if node not in placed and all(parent in placed for parent in self.parents[node])]
+            if not ready:
+                raise ValueError("Network has a directed cycle")
+            order.extend(ready)
+            placed.update(ready)
+        return order
+
+    def markov_blanket(self, node):
+        """Parents, children and the children's other parents"""
+        blanket = self.parents[node] + self.children[node]
+        for child in self.children[node]:
+            blanket += self.parents[child]
+        return [other for other in dict.fromkeys(blanket) if other != node]
+
+    def blanket_factors(self, node):
+        """
+        Every CPT that mentions node (its own and its children's), as flat index arrays
+
+        Returns:
+            list: (flat table, state columns of the other scope nodes, their strides,
+            stride of node) per factor
+        """
+        factors = []
+        for owner in [node] + self.children[node]:
+            scope = self.parents[owner] + [owner]
+            table = self.tables[owner]
+            strides = np.array(table.strides) // table.itemsize
+            others = [axis for axis, name in enumerate(scope) if name != node]
+            factors.append((table.ravel(), np.array([self.index[scope[axis]] for axis in others], dtype=np.intp),
+                            strides[others], int(strides[scope.index(node)])))
+        return factors
+
+
+class MultiChainSampler:
+    """
+    Shared state of the Lab 7 samplers: many chains as one (chains, nodes) int array
+
+    Subclasses implement sweep(), which advances every chain by one pass over the
+    unobserved nodes. Evidence nodes stay clamped to their observed value.
+    """
+
+    def __init__(self, model, chains=4096, seed=None, evidence=None):
+        self.network = model if isinstance(model, DiscreteNetwork) else DiscreteNetwork.from_marginals(model)
+        self.nodes, self.values, self.index = self.network.nodes, self.network.values, self.network.index
+        self.rng = np.random.default_rng(seed)
+        self.state = np.zeros((chains, len(self.nodes)), dtype=np.int32)
+
+        self.evidence = {node: self.encode(node, value) for node, value in (evidence or {}).items()}
+        self.free = [node for node in self.nodes if node not in self.evidence]
+
+    @property
+    def chains(self):
+        return len(self.state)
+
+    def encode(self, node, value):
+        try:
+            return self.values[node].index(value)
+        except ValueError:
+            raise ValueError(f"Unknown value {value!r} for node {node}") from None
+
+    def initialize(self, state=None):
+        """
+        Start every chain from the same {node: value} state, or by forward sampling
+
+        Evidence nodes are clamped to their observed value either way.
+        """
+        if state is not None:
+            self.state[:] = [self.encode(node, state[node]) for node in self.nodes]
+        else:
+            for node in self.network.topological_order():
+                table = self.network.tables[node][tuple(self.state[:, self.index[parent]]
+                                                        for parent in self.network.parents[node])]
+                self.state[:, self.index[node]] = self._sample(np.broadcast_to(table, (self.chains, table.shape[-1])))
+        for node, value in self.evidence.items():
+            self.state[:, self.index[node]] = value
+        return self
+
+    def _sample(self, weights):
+        """One draw per row of an unnormalized (chains, values) weight array"""
+        cumulative = np.cumsum(weights, axis=1)
+        u = self.rng.random(len(weights)) * cumulative[:, -1]
+        return np.minimum((cumulative <= u[:, None]).sum(axis=1), weights.shape[1] - 1)
+
+    def sweep(self):
+        raise NotImplementedError
+
+    def sample(self, accumulators, iterations=None, burn_in=0):
+        """
+        Sweep every chain and feed each accumulator the new state, in place
+
+        A generator yielding the number of recorded sweeps so far, so callers can read
+        accumulator snapshots mid-run; with iterations=None it runs until stopped.
+        """
+        for _ in range(burn_in):
+            self.sweep()
+
+        recorded = 0
+        while iterations is None or recorded < iterations:
+            self.sweep()
+            for accumulator in accumulators:
+                accumulator.update(self.state)
+            recorded += 1
+            yield recorded
+
+    def run(self, target_node, iterations=1000, burn_in=0, accumulators=()):
+        """
+        Posterior of target_node from iterations sweeps of every chain
+
+        Any extra accumulators are updated on the same sweeps.
+
+        Returns:
+            dict: {value: frequency} over chains * iterations samples
+        """
+        counts = ValueCounts(self.network, [target_node])
+        for _ in self.sample([counts, *accumulators], iterations, burn_in):
+            pass
+        return counts.snapshot()[target_node]
+
+
+class VectorizedGibbs(MultiChainSampler):
+    """
+    Many independent Gibbs chains advanced in lockstep
+
+    A sweep visits every unobserved node and draws it for all chains at once from its
+    full conditional, the product of only the CPTs in its Markov blanket: each factor
+    is gathered at the chains' current blanket values through precomputed flat
+    indices, so a step costs O(blanket), not O(network). A node whose only factor is
+    its own parentless table is drawn by searchsorted against its precomputed
+    cumulative table.
+    """
+
+    def __init__(self, model, chains=4096, seed=None, evidence=None):
+        super().__init__(model, chains, seed, evidence)
+        self.factors = {node: self.network.blanket_factors(node) for node in self.free}
+        self.cdf = {node: np.cumsum(self.network.tables[node]) for node in self.free
+                    if not self.network.parents[node] and not self.network.children[node]}
+        self.initialize()
+
+    def conditional(self, node):
+        """Unnormalized (chains, values) full conditional of node given each chain's blanket"""
+        offsets = np.arange(len(self.values[node]))
+        weights = None
+        for table, columns, strides, stride in self.factors[node]:
+            base = self.state[:, columns] @ strides if len(columns) else np.zeros(self.chains, dtype=np.intp)
+            factor = table[base[:, None] + stride * offsets]
+            weights = factor if weights is None else weights * factor
+        return weights
+
+    def draw(self, node):
+        if node in self.cdf:
+            cdf = self.cdf[node]
+            # Rounding can leave cdf[-1] a hair under 1; clip so u never falls off the end
+            return np.minimum(np.searchsorted(cdf, self.rng.random(self.chains), side='right'), len(cdf) - 1)
+        return self._sample(self.conditional(node))
+
+    def sweep(self):
+        for node in self.free:
+            self.state[:, self.index[node]] = self.draw(node)
@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gibbs import VectorizedGibbs
+from metropolis import IncrementalMetropolis
+
+SAMPLERS = {'gibbs': VectorizedGibbs, 'metropolis': IncrementalMetropolis}
+
+
+class BatchMeans:
+    """
+    Per-chain batch means of the target's value indicators, in bounded memory
+
+    Workers report counts in batches of base_size recorded sweeps. Once a chain has
+    2 * max_batches batches, neighbouring batches are merged pairwise and the batch
+    size doubles, so memory stays O(chains * max_batches) however long the run.
+    """
+
+    def __init__(self, chains, n_values, base_size, max_batches=128):
+        self.base_size = base_size
+        self.batch_size = base_size
+        self.max_batches = max_batches
+        self.sums = np.zeros((chains, 0, n_values))
+        self.pending = np.zeros((chains, n_values))
+        self.pending_batches = 0
+
+    def add(self, counts):
+        """Add (chains, batches, values) indicator counts of consecutive base-size batches"""
+        for batch in range(counts.shape[1]):
+            self.pending += counts[:, batch]
+            self.pending_batches += 1
+            if self.pending_batches * self.base_size == self.batch_size:
+                self.sums = np.concatenate([self.sums, self.pending[:, None]], axis=1)
+                self.pending = np.zeros_like(self.pending)
+                self.pending_batches = 0
+                if self.sums.shape[1] == 2 * self.max_batches:
+                    self.sums = self.sums[:, 0::2] + self.sums[:, 1::2]
+                    self.batch_size *= 2
+
+    @property
+    def means(self):
+        return self.sums / self.batch_size
+
+    @property
+    def draws(self):
+        return self.sums.shape[0] * self.sums.shape[1] * self.batch_size
+
+
+def split_rhat(means):
+    """
+    Split-R-hat of (chains, batches, values) batch means, worst value
+
+    Each chain is cut into two halves that are compared as separate chains.
+    """
+    half = means.shape[1] // 2
+    if half < 2:
+        return np.inf
+    halves = np.concatenate([means[:, :half], means[:, half:2 * half]], axis=0)
+    within = halves.var(axis=1, ddof=1).mean(axis=0)
+    between = halves.mean(axis=1).var(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rhat = np.sqrt(((half - 1) / half * within + between) / within)
+    rhat = rhat[within > 0]
+    return float(rhat.max()) if len(rhat) else 1.0
+
+
+def effective_sample_size(batch_means):
+    """
+    Batch-means ESS of the value indicators, smallest over values
+
+    An indicator's per-draw variance is p(1 - p), so ESS = draws * p(1 - p) /
+    (batch_size * variance of the batch means).
+    """
+    means = batch_means.means.reshape(-1, batch_means.sums.shape[2])
+    if len(means) < 2:
+        return 0.0
+    p = means.mean(axis=0)
+    batch_variance = batch_means.batch_size * means.var(axis=0, ddof=1)
+    informative = (p * (1 - p) > 0) & (batch_variance > 0)
+    if not informative.any():
+        return float(batch_means.draws)
+    ess = batch_means.draws * p[informative] * (1 - p[informative]) / batch_variance[informative]
+    return float(min(ess.min(), batch_means.draws))
+
+
+def _advance(job):
+    """
+    Worker: run one sampler and count the target's values per batch of recorded sweeps
+
+    Returns:
+        tuple: (advanced sampler, (chains, batches, values) counts)
+    """
+    sampler, column, n_values, batches, batch_size, thin = job
+    counts = np.zeros((sampler.chains, batches, n_values))
+    rows = np.arange(sampler.chains)
+    for batch in range(batches):
+        for _ in range(batch_size):
+            for _ in range(thin):
+                sampler.sweep()
+            counts[rows, batch, sampler.state[:, column]] += 1
+    return sampler, counts
+
+
+def run_parallel(model, target_node, evidence=None, method='gibbs', processes=None, chains_per_process=1024,
+                 seed=None, burn_in=100, thin=1, batch_size=10, round_sweeps=100, target_ess=10000,
+                 max_rhat=1.01, max_sweeps=100000, **sampler_options):
+    """
+    Independent MCMC chains across a process pool, stopped once they have converged
+
+    Every worker owns a multi-chain sampler seeded from its own SeedSequence child,
+    so streams never overlap. After each round of round_sweeps recorded sweeps the
+    split-R-hat and the effective sample size of target_node's indicators are
+    recomputed from bounded batch means, and sampling stops as soon as
+    ESS >= target_ess and R-hat <= max_rhat, or after max_sweeps.
+
+    Args:
+        model (DiscreteNetwork or dict): Network, or Task1's marginal tables
+        method (str): 'gibbs' or 'metropolis'; sampler_options go to its constructor
+        thin (int): Sweeps per recorded sample
+
+    Returns:
+        dict: posterior, ess, rhat, sweeps per chain, chains and whether it converged
+    """
+    processes = processes or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    samplers = [SAMPLERS[method](model, chains=chains_per_process, seed=child, evidence=evidence, **sampler_options)
+                for child in seeds]
+    column = samplers[0].index[target_node]
+    values = samplers[0].values[target_node]
+    round_batches = max(1, round_sweeps // batch_size)
+    statistics = BatchMeans(processes * chains_per_process, len(values), batch_size)
+
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    mapper = pool.map if pool else map
+    try:
+        samplers = [sampler for sampler, _ in mapper(_advance, [(sampler, column, len(values), 1, burn_in, thin)
+                                                                for sampler in samplers])]
+        sweeps, ess, rhat = 0, 0.0, np.inf
+        while sweeps < max_sweeps:
+            results = list(mapper(_advance, [(sampler, column, len(values), round_batches, batch_size, thin)
+                                             for sampler in samplers]))
+            samplers = [sampler for sampler, _ in results]
+            statistics.add(np.concatenate([counts for _, counts in results]))
+            sweeps += round_batches * batch_size
+
+            ess, rhat = effective_sample_size(statistics), split_rhat(statistics.means)
+            if ess >= target_ess and rhat <= max_rhat:
+                break
+    finally:
+        if pool:
+            pool.shutdown()
+
+    posterior = statistics.sums.sum(axis=(0, 1)) / statistics.draws
+    return {'posterior': dict(zip(values, posterior)), 'ess': ess, 'rhat': rhat, 'sweeps': sweeps,
+            'chains': processes * chains_per_process, 'converged': ess >= target_ess and rhat <= max_rhat}